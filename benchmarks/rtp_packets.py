@@ -0,0 +1,43 @@
+"""
+Micro-benchmark of the RTP packets of the voices : packets encoded per second by AudioStream,
+compared to building the header byte by byte and concatenating the packet
+
+	python benchmarks/rtp_packets.py
+
+A voice connection sends 50 packets per second
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from piscord.Voice import AudioStream
+
+FRAME = os.urandom(160)
+NUMBER = 200_000
+
+def naive(sequence, timestamp, ssrc, audio):
+	packet = bytearray()
+	packet.append(0x80)
+	packet.append(0x78)
+	for value, size in ((sequence, 2), (timestamp, 4), (ssrc, 4)):
+		for i in range(size, 0, -1):
+			x = 256**(i-1)
+			packet.append(value // x)
+			value = value % x
+	return bytes(packet) + audio
+
+def main():
+	stream = AudioStream(12345)
+	results = {
+		"byte by byte": timeit.timeit(lambda: naive(stream.sequence, stream.timestamp, stream.ssrc, FRAME), number=NUMBER),
+		"AudioStream.encode_packet": timeit.timeit(lambda: stream.encode_packet(FRAME), number=NUMBER)
+	}
+	for name, duration in results.items():
+		rate = NUMBER / duration
+		print(f"{name:>26} : {rate:>12,.0f} packets/s ({rate / 50:,.0f} voice connections)")
+
+if __name__ == "__main__":
+	main()
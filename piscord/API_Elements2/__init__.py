@@ -8,4 +8,6 @@ from .channel import *
 from .ban import *
 from .attachement import *
 from .reaction import *
-from .embed import *
\ No newline at end of file
+from .embed import *
+from .iterators import *
+from .file import *
\ No newline at end of file
@@ -2,9 +2,13 @@ from .overwrite import Overwrite
 from .attachement import Attachment
 from .reaction import Reaction
 from .embed import Embed
-from .utilities import Cache
+from .utilities import Cache, snowflake_time
+from .iterators import HistoryIterator
+from ..Errors import PurgeError
 
 from enum import IntEnum
+import asyncio
+import time
 
 
 class CHANNEL_TYPE(IntEnum):
@@ -101,6 +105,21 @@ class Channel:
     def __repr__(self):
         return f"{self.__class__.__name__}(\"{self.name or self.id}\")"
 
+    def permissions_for(self, member):
+
+        """
+        Compute the permissions of a guild member in the channel, with its roles and the channel overwrites
+
+        The result is cached until the roles, the channel or the member are updated
+
+        member: :class:`Member`
+            A member of the guild of the channel
+
+        Return :class:`Perm`
+        """
+
+        return self.__bot.permissions_cache.get(self.guild, member, self)
+
     def __init_subclass__(cls):
         if not hasattr(cls, "__channel_type__"):
             cls.__channel_type__ = CHANNEL_TYPE.DEFAULT
@@ -109,6 +128,7 @@ class Channel:
 class TextChannel(Channel):
 
     __channel_type__ = CHANNEL_TYPE.TEXT_CHANNEL
+    BULK_DELETE_MAX_AGE = 14 * 24 * 3600 - 60
 
     def __init__(self, channel, bot, guild=None):
         super().__init__(channel, bot, guild)
@@ -123,6 +143,7 @@ class TextChannel(Channel):
         self.rate_limit_per_user = channel.get("rate_limit_per_user")
         self.parent_id = channel.get("parent_id")
         self.last_pin_timestamp = channel.get("last_pin_timestamp")
+        self.__bot = bot
 
     def edit(self,**modifs):
 
@@ -145,23 +166,15 @@ class TextChannel(Channel):
         
         Use send(files=[[b"data_2","title_1"],[b"data_2","title_2"]]) to send files by their data
 
+        Use send(files=[File(fp,"title")]) to send a file object, bytes or an async iterator (see :class:`File`)
+
+        The files are read while they are sent, and not loaded in memory
+
         Return :class:`Message`
         """
 
         if files is not None:
-            form = aiohttp.FormData()
-            form.add_field('payload_json', json.dumps({"content":content,**kwargs}))
-            for i, file in enumerate(files):
-                if type(file) == str:
-                    filename = file
-                    with open(filename,"rb") as f:
-                        file_content = f.read()
-                elif type(file) == list:
-                    file_content, filename = file
-                else:
-                    raise TypeError("Files should be a list or a string")
-                form.add_field(f"file {i}", file_content, filename=filename)
-            return Message(self.__bot.api(f"/channels/{self.id}/messages", "POST", data=form),self.__bot)
+            return Message(self.__bot.api(f"/channels/{self.id}/messages", "POST", json={"content":content,**kwargs}, files=files),self.__bot)
         else:
             return Message(self.__bot.api(f"/channels/{self.id}/messages", "POST", json={"content":content,**kwargs}),self.__bot)
 
@@ -188,6 +201,27 @@ class TextChannel(Channel):
         messages = self.__bot.api(f"/channels/{self.id}/messages","GET",params=params)
         return [Message(message,self.__bot) for message in messages]
 
+    def history(self,limit=None,before=None,after=None):
+
+        """
+        Iterate over the messages of the channel, requesting the pages when needed
+
+        Use it with : async for message in channel.history()
+
+        limit:
+            The max number of messages, None for all the messages
+        before:
+            ID of a message : Retrieves messages that are before the message
+        after:
+            ID of a message : Retrieves messages that are after the message
+
+            If only after is specified, the messages are returned from the oldest to the newest
+
+        Return a :class:`HistoryIterator` of :class:`Message`
+        """
+
+        return HistoryIterator(self.__bot,self.id,lambda message: Message(message,self.__bot),limit,before,after)
+
     def get_message(self,message_id):
 
         """
@@ -262,26 +296,92 @@ class TextChannel(Channel):
 
         self.__bot.api(f"/channels/{self.id}/messages/bulk-delete","POST",json={"messages":messages_ids})
 
-    def purge(self, max, before = None, after = None):
+    def purge(self, max=None, before=None, after=None, check=None, progress=None, concurrency=10):
 
         """
         Delete messages from a channels
 
         max:
-            The number of messages to delete
-
-            Max : 100
+            The number of messages to delete, None to delete all the messages
         before:
             The messages before a message id
         after:
             The messages after a message id
+        check:
+            A function called with each :class:`Message`, only the messages for which it returns True are deleted
+        progress:
+            A function called with the number of deleted messages, each time messages are deleted
+        concurrency:
+            The max number of delete requests sent at the same time
+
+        Return the number of deleted messages
+        If a delete fails, no other delete is sent and a :class:`PurgeError` is raised,
+        with the number of deleted messages and the errors
         """
 
-        if max > 100:
-            raise ValueError("Max number exceeded")
+        return self.__bot.run_coroutine(self.purge_async(max,before,after,check,progress,concurrency))
 
-        messages = [message.id for message in self.get_messages(limit=max,before=before,after=after)]
-        self.bulk_delete(messages)
+    async def purge_async(self, max=None, before=None, after=None, check=None, progress=None, concurrency=10):
+
+        """
+        Same as TextChannel.purge, but to be awaited in a running event loop
+
+        The messages are read with TextChannel.history, and deleted by groups of 100 with a bulk delete.
+        Messages older than 14 days can't be bulk deleted : they are deleted one by one.
+        The requests are sent without waiting for the previous ones, the rate limiter spaces them.
+        """
+
+        bulk_limit = time.time() - self.BULK_DELETE_MAX_AGE
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+        deleted = 0
+
+        async def delete(messages_ids):
+            nonlocal deleted
+            try:
+                if len(messages_ids) == 1:
+                    await self.__bot.api_async(f"/channels/{self.id}/messages/{messages_ids[0]}","DELETE")
+                else:
+                    await self.__bot.api_async(f"/channels/{self.id}/messages/bulk-delete","POST",json={"messages":messages_ids})
+                deleted += len(messages_ids)
+                if progress:
+                    progress(deleted)
+            finally:
+                semaphore.release()
+
+        def failed():
+            return any(task.done() and not task.cancelled() and task.exception() for task in tasks)
+
+        async def schedule(messages_ids):
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(delete(messages_ids)))
+
+        chunk = []
+        count = 0
+        async for message in self.history(limit=None if check else max,before=before,after=after):
+            if failed():
+                break
+            if check and not check(message):
+                continue
+            if snowflake_time(message.id) < bulk_limit:
+                await schedule([message.id])
+            else:
+                chunk.append(message.id)
+                if len(chunk) == 100:
+                    await schedule(chunk)
+                    chunk = []
+            count += 1
+            if max is not None and count >= max:
+                break
+        if chunk and not failed():
+            await schedule(chunk)
+
+        # every task is kept until the end, so no error is lost
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise PurgeError(deleted, errors)
+        return deleted
 
     def typing(self):
 
@@ -306,12 +406,32 @@ class VoiceChannel(Channel):
         self.parent_id = channel.get("parent_id")
         self.bitrate = channel.get("bitrate")
         self.user_limit = channel.get("user_limit")
+        self.__bot = bot
 
-    def join(self):
+    def join(self, mute=False, deaf=False, timeout=10):
         """
-        Join the voice channel
+        Join the voice channel, and return the :class:`Voice` of the guild once connected
+
+        mute:
+            If the bot is muted
+        deaf:
+            If the bot is deafened
+        timeout:
+            The max time to wait for the connection, in seconds
         """
-        raise NotImplementedError()
+        return self.__bot.voice_manager.join(self.guild_id, self.id, mute, deaf, timeout)
+
+    async def join_async(self, mute=False, deaf=False, timeout=10):
+        """
+        Same as VoiceChannel.join, to be awaited in the event loop of the bot
+        """
+        return await self.__bot.voice_manager.connect(self.guild_id, self.id, mute, deaf, timeout)
+
+    def leave(self):
+        """
+        Leave the voice channel
+        """
+        self.__bot.voice_manager.leave(self.guild_id)
 
 
 class CategoryChannel(Channel):
@@ -773,20 +893,7 @@ class Webhook:
         """
 
         if files:
-            form = aiohttp.FormData()
-            form.add_field('payload_json', json.dumps({"content":content,**kwargs}))
-            for i in range(len(files)):
-                file = files[i]
-                if type(file) == str:
-                    with open(file,"rb") as f:
-                        c = f.read()
-                elif type(file) == list:
-                    c = file[0]
-                    file = file[1]
-                else:
-                    raise TypeError("File should be a list or a string")
-                form.add_field(f"file {i}", c, filename=file)
-            return self.__bot.api(f"/webhooks/{self.id}/{self.token}", "POST", data=form)
+            return self.__bot.api(f"/webhooks/{self.id}/{self.token}", "POST", json={"content":content,**kwargs}, files=files)
         return self.__bot.api(f"/webhooks/{self.id}/{self.token}", "POST", json={"content":content,**kwargs})
 
     def edit(self,**modifs):
@@ -1,4 +1,93 @@
 from .utilities import API_Element
+from ..Errors import EmbedError
+
+class Embed_Element(API_Element):
+
+	"""
+	Base class of the parts of an Embed (footer, image, author, field...) :
+	changing one of their attributes clears the json of the Embed
+	"""
+
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		embed = self.__dict__.get("_embed")
+		if embed is not None:
+			embed.changed()
+
+
+class Embed_Fields(list):
+
+	"""
+	The list of the fields of an Embed : changing the list clears the json of the Embed
+	"""
+
+	def __init__(self, embed, fields=()):
+		list.__init__(self, fields)
+		self._embed = embed
+		self.attach(self)
+
+	def attach(self, fields):
+		for field in fields:
+			object.__setattr__(field, "_embed", self._embed)
+
+	def changed(self):
+		self._embed.changed()
+
+	def __setitem__(self, index, value):
+		list.__setitem__(self, index, value)
+		self.attach(value if isinstance(index, slice) else [value])
+		self.changed()
+
+	def __delitem__(self, index):
+		list.__delitem__(self, index)
+		self.changed()
+
+	def __iadd__(self, fields):
+		self.extend(fields)
+		return self
+
+	def __imul__(self, number):
+		list.__imul__(self, number)
+		self.changed()
+		return self
+
+	def append(self, field):
+		list.append(self, field)
+		self.attach([field])
+		self.changed()
+
+	def extend(self, fields):
+		fields = list(fields)
+		list.extend(self, fields)
+		self.attach(fields)
+		self.changed()
+
+	def insert(self, index, field):
+		list.insert(self, index, field)
+		self.attach([field])
+		self.changed()
+
+	def pop(self, index=-1):
+		field = list.pop(self, index)
+		self.changed()
+		return field
+
+	def remove(self, field):
+		list.remove(self, field)
+		self.changed()
+
+	def clear(self):
+		list.clear(self)
+		self.changed()
+
+	def sort(self, *args, **kwargs):
+		list.sort(self, *args, **kwargs)
+		self.changed()
+
+	def reverse(self):
+		list.reverse(self)
+		self.changed()
+
 
 class Embed(API_Element):
 
@@ -46,11 +135,41 @@ class Embed(API_Element):
 	author: :class:`Embed_Author`
 		The author informations of the Embed
 	fields: :class:`Embed_Field`
-		List of Embed fields
+		List of Embed fields (an :class:`Embed_Fields`, which clears the json of the Embed when it is changed)
 
 		Max : 25
+
+	The sum of the characters of the title, description, fields, footer and author is limited to 6000.
+	The limits are checked when the embed is built, and when it is converted to json.
+
+	An Embed can be built by chaining its methods :
+
+		embed = Embed().set_title("News").set_color(0x00ff00).add(name="Version", value="1.5", inline=True)
+
+	The json of the embed (Embed.to_json) is kept until the embed is changed :
+	an embed sent many times is converted once. The returned dict should not be modified.
 	"""
 
+	LIMITS = {"title": 256, "description": 2048, "fields": 25, "field name": 256, "field value": 1024,
+		"footer": 2048, "author": 256, "total": 6000}
+
+	def __setattr__(self, name, value):
+		if name == "fields":
+			value = Embed_Fields(self, value)
+		object.__setattr__(self, name, value)
+		if isinstance(value, Embed_Element):
+			object.__setattr__(value, "_embed", self)
+		if not name.startswith("_"):
+			self.changed()
+
+	def changed(self):
+
+		"""
+		Clear the json of the embed, called when the embed is changed
+		"""
+
+		object.__setattr__(self, "_json", None)
+
 	def __init__(self,embed={}):
 		self.title = embed.get("title")
 		self.type = embed.get("type")
@@ -74,11 +193,120 @@ class Embed(API_Element):
 		Return the field
 		"""
 
-		self.fields.append(Embed_Field(kwargs))
-		return self.fields[-1]
+		if len(self.fields) >= self.LIMITS["fields"]:
+			raise EmbedError(f"more than {self.LIMITS['fields']} fields")
+		self.check("field name", kwargs.get("name"))
+		self.check("field value", kwargs.get("value"))
+		field = Embed_Field(kwargs)
+		self.fields.append(field)
+		return field
+
+	def add(self, name, value, inline=False):
+
+		"""
+		Add a field, and return the Embed
+		"""
+
+		self.add_field(name=name, value=value, inline=inline)
+		return self
+
+	def remove_field(self, index):
+		del self.fields[index]
+		return self
+
+	def clear_fields(self):
+		self.fields = []
+		return self
+
+	def set_title(self, title, url=None):
+		self.check("title", title)
+		self.title = title
+		if url is not None:
+			self.url = url
+		return self
+
+	def set_description(self, description):
+		self.check("description", description)
+		self.description = description
+		return self
+
+	def set_color(self, color):
+		self.color = color
+		return self
+
+	def set_timestamp(self, timestamp):
+
+		"""
+		timestamp:
+			ISO8601 timestamp, or a datetime
+		"""
+
+		self.timestamp = timestamp.isoformat() if hasattr(timestamp, "isoformat") else timestamp
+		return self
+
+	def set_footer(self, text, icon_url=None):
+		self.check("footer", text)
+		self.footer = Embed_Footer({"text": text, "icon_url": icon_url})
+		return self
+
+	def set_image(self, url):
+		self.image = Embed_Image({"url": url})
+		return self
+
+	def set_thumbnail(self, url):
+		self.thumbnail = Embed_Image({"url": url})
+		return self
+
+	def set_author(self, name, url=None, icon_url=None):
+		self.check("author", name)
+		self.author = Embed_Author({"name": name, "url": url, "icon_url": icon_url})
+		return self
+
+	def check(self, limit, text):
+		if text is not None and len(text) > self.LIMITS[limit]:
+			raise EmbedError(f"{limit} longer than {self.LIMITS[limit]} characters")
+
+	@property
+	def characters(self):
+
+		"""
+		The number of characters counted in the limit of 6000
+		"""
+
+		texts = [self.title, self.description, self.footer.text, self.author.name]
+		for field in self.fields:
+			texts += [field.name, field.value]
+		return sum(len(text) for text in texts if text)
+
+	def validate(self):
 
+		"""
+		Check the limits of discord, raise :class:`EmbedError` if a limit is exceeded
+		"""
 
-class Embed_Footer(API_Element):
+		self.check("title", self.title)
+		self.check("description", self.description)
+		self.check("footer", self.footer.text)
+		self.check("author", self.author.name)
+		if len(self.fields) > self.LIMITS["fields"]:
+			raise EmbedError(f"more than {self.LIMITS['fields']} fields")
+		for field in self.fields:
+			self.check("field name", field.name)
+			self.check("field value", field.value)
+		if self.characters > self.LIMITS["total"]:
+			raise EmbedError(f"more than {self.LIMITS['total']} characters")
+
+	def to_json(self):
+		json = self.__dict__.get("_json")
+		if json is not None:
+			return json
+		self.validate()
+		json = {key: value for key, value in API_Element.to_json(self).items() if value != {}}
+		object.__setattr__(self, "_json", json)
+		return json
+
+
+class Embed_Footer(Embed_Element):
 
 	"""
 	Represent the footer of an Embed
@@ -97,7 +325,7 @@ class Embed_Footer(API_Element):
 		self.proxy_icon_url = footer.get("proxy_icon_url")
 
 
-class Embed_Image(API_Element):
+class Embed_Image(Embed_Element):
 
 	"""
 	Represent a Embed Image, Embed Thumbnail and Embed Video
@@ -119,7 +347,7 @@ class Embed_Image(API_Element):
 		self.width = image.get("width")
 
 
-class Embed_Provider(API_Element):
+class Embed_Provider(Embed_Element):
 
 	"""
 	Represent a Embed Provider
@@ -135,7 +363,7 @@ class Embed_Provider(API_Element):
 		self.url = provider.get("url")
 
 
-class Embed_Author(API_Element):
+class Embed_Author(Embed_Element):
 
 	"""
 	Represent a Embed Author
@@ -159,7 +387,7 @@ class Embed_Author(API_Element):
 		self.proxy_icon_url = author.get("proxy_icon_url")
 
 
-class Embed_Field(API_Element):
+class Embed_Field(Embed_Element):
 
 	"""
 	Represent a Embed Field
@@ -0,0 +1,144 @@
+import aiohttp
+import io
+import json
+import os
+
+from ..Errors import FileError
+
+class File:
+
+	"""
+	Represent a file to send in a message
+
+	The file is read while the request is sent, and not before : it is never entirely loaded in memory.
+	The same File can be sent again (when a request is retried), except if it is an async iterator
+	or a file object which is not seekable : sending it again raises a :class:`FileError`.
+
+	fp:
+		The content of the file, can be :
+			- The path of the file
+			- A binary file object (the file is read from its current position)
+			- The data : bytes, bytearray or memoryview (sent without copy)
+			- An async iterator of bytes
+	filename:
+		The name of the file in discord. By default, the name of the path or of the file object
+	"""
+
+	def __init__(self, fp, filename=None):
+		self.fp = fp
+		self.filename = filename
+		self.position = None
+		self.consumed = False
+
+		if isinstance(fp, str):
+			self.filename = filename or os.path.basename(fp)
+		elif isinstance(fp, (bytes, bytearray, memoryview)):
+			pass
+		elif hasattr(fp, "read"):
+			if self.filename is None and isinstance(getattr(fp, "name", None), str):
+				self.filename = os.path.basename(fp.name)
+			if fp.seekable():
+				self.position = fp.tell()
+		elif not hasattr(fp, "__aiter__"):
+			raise TypeError("File should be a path, a file object, bytes or an async iterator")
+
+		if self.filename is None:
+			self.filename = "file"
+
+	def __repr__(self):
+		return f"File(\"{self.filename}\")"
+
+	@classmethod
+	def convert(cls, file):
+
+		"""
+		Return a :class:`File` from a value accepted by TextChannel.send : a :class:`File`,
+		a [data, filename] list, or any value accepted as 'fp'
+		"""
+
+		if isinstance(file, File):
+			return file
+		if isinstance(file, list):
+			return cls(file[0], file[1])
+		return cls(file)
+
+	def payload(self):
+
+		"""
+		Return the content to give to aiohttp, ready to be read from the beginning of the file
+		"""
+
+		if isinstance(self.fp, str):
+			return open(self.fp, "rb")
+		if isinstance(self.fp, (bytes, bytearray, memoryview)):
+			return self.fp
+		if hasattr(self.fp, "read"):
+			if self.position is not None:
+				self.fp.seek(self.position)
+			elif self.consumed:
+				raise FileError(f"{self} is not seekable and can't be sent again")
+			self.consumed = True
+			return _Unclosable(self.fp)
+		if self.consumed:
+			raise FileError(f"{self} is an async iterator and can't be sent again")
+		self.consumed = True
+		return self.fp
+
+	@staticmethod
+	def form(files, payload=None):
+
+		"""
+		Create the multipart form of a message with files
+
+		files:
+			List of :class:`File`
+		payload:
+			The json parameters of the message
+		"""
+
+		form = aiohttp.FormData()
+		form.add_field("payload_json", json.dumps(payload or {}))
+		for i, file in enumerate(files):
+			form.add_field(f"file {i}", file.payload(), filename=file.filename)
+		return form
+
+
+class _Unclosable(io.RawIOBase):
+
+	"""
+	File object given to aiohttp, which closes the files once sent :
+	the file of the user stays open, so it can be sent again.
+	"""
+
+	def __init__(self, file):
+		self.file = file
+
+	def readable(self):
+		return True
+
+	def read(self, size=-1):
+		return self.file.read(size)
+
+	def readinto(self, buffer):
+		data = self.file.read(len(buffer))
+		buffer[:len(data)] = data
+		return len(data)
+
+	def seekable(self):
+		return self.file.seekable()
+
+	def seek(self, offset, whence=0):
+		return self.file.seek(offset, whence)
+
+	def tell(self):
+		return self.file.tell()
+
+	def fileno(self):
+		return self.file.fileno()
+
+	@property
+	def name(self):
+		return getattr(self.file, "name", None)
+
+	def close(self):
+		pass
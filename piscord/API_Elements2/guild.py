@@ -2,7 +2,9 @@ from .role import Role
 from .emoji import Emoji
 from .channel import Channel, Member, User, Webhook
 from .ban import Ban
+from .iterators import MembersIterator
 from ..Permission import *
+import asyncio
 
 class Guild:
 
@@ -233,6 +235,23 @@ class Guild:
 		members = self.__bot.api(f"/guilds/{self.id}/members","GET",params={"limit":limit,"after":after})
 		return [Member({**member,"guild_id":self.id},self.__bot) for member in members]
 
+	def fetch_members(self, limit=None, after=None):
+
+		"""
+		Iterate over the members of the guild, requesting the pages when needed
+
+		Use it with : async for member in guild.fetch_members()
+
+		limit:
+			The max number of members, None for all the members
+		after:
+			ID of a user : Retrieves members whose id is after this id
+
+		Return a :class:`MembersIterator` of :class:`Member`
+		"""
+
+		return MembersIterator(self.__bot,self.id,lambda member: Member({**member,"guild_id":self.id},self.__bot),limit,after)
+
 	def get_member(self,user_id):
 
 		"""
@@ -289,6 +308,154 @@ class Guild:
 
 		return Role({**self.__bot.api(f"/guilds/{self.id}/roles", "POST", json=kwargs),"guild_id":self.id},self.__bot)
 
+	def bulk_add_role(self, role, members, concurrency=10):
+
+		"""
+		Add a role to many members, sending the requests concurrently
+
+		role: :class:`Role`
+			A guild role object
+		members:
+			List of :class:`Member` or of user ids
+		concurrency:
+			The max number of requests sent at the same time
+
+		Members who already have the role (according to the cache) are skipped
+
+		Return a dict {user id: result}, the result being True if the role was added,
+		False if the member was skipped, or the error raised by the request
+		"""
+
+		return self.__bot.run_coroutine(self.bulk_add_role_async(role, members, concurrency))
+
+	async def bulk_add_role_async(self, role, members, concurrency=10):
+
+		"""
+		Same as Guild.bulk_add_role, but to be awaited in a running event loop
+		"""
+
+		def skip(member):
+			return role.id in member.roles_id
+
+		def update(member):
+			member.roles_id.append(role.id)
+			if member.roles is not None:
+				member.roles.append(role)
+
+		request = lambda member: (f"/guilds/{self.id}/members/{member.id}/roles/{role.id}", "PUT", {})
+		return await self.__bulk(members, request, skip, update, concurrency)
+
+	def bulk_remove_role(self, role, members, concurrency=10):
+
+		"""
+		Remove a role from many members, sending the requests concurrently
+
+		Members who don't have the role (according to the cache) are skipped
+
+		Parameters and result are the same as Guild.bulk_add_role
+		"""
+
+		return self.__bot.run_coroutine(self.bulk_remove_role_async(role, members, concurrency))
+
+	async def bulk_remove_role_async(self, role, members, concurrency=10):
+
+		"""
+		Same as Guild.bulk_remove_role, but to be awaited in a running event loop
+		"""
+
+		def skip(member):
+			return role.id not in member.roles_id
+
+		def update(member):
+			if role.id in member.roles_id:
+				member.roles_id.remove(role.id)
+			if member.roles is not None and role in member.roles:
+				member.roles.remove(role)
+
+		request = lambda member: (f"/guilds/{self.id}/members/{member.id}/roles/{role.id}", "DELETE", {})
+		return await self.__bulk(members, request, skip, update, concurrency)
+
+	def bulk_edit_members(self, members, concurrency=10, **modifs):
+
+		"""
+		Modify many members with the same parameters, sending the requests concurrently
+		Parameters : https://discord.com/developers/docs/resources/guild#modify-guild-member
+
+		Members who already have these values (nick, roles, mute, deaf, according to the cache) are skipped
+
+		Other parameters and result are the same as Guild.bulk_add_role
+		"""
+
+		return self.__bot.run_coroutine(self.bulk_edit_members_async(members, concurrency, **modifs))
+
+	async def bulk_edit_members_async(self, members, concurrency=10, **modifs):
+
+		"""
+		Same as Guild.bulk_edit_members, but to be awaited in a running event loop
+		"""
+
+		def skip(member):
+			for key, value in modifs.items():
+				if key == "roles":
+					if set(member.roles_id) != set(value):
+						return False
+				elif key not in ("nick", "mute", "deaf") or getattr(member, key) != value:
+					return False
+			return True
+
+		roles = {role.id: role for role in self.roles}
+
+		def update(member):
+			for key, value in modifs.items():
+				if key == "roles":
+					member.roles_id = [str(role_id) for role_id in value]
+					if member.roles is not None:
+						member.roles = [roles[role_id] for role_id in member.roles_id if role_id in roles]
+				elif key in ("nick", "mute", "deaf"):
+					setattr(member, key, value)
+
+		request = lambda member: (f"/guilds/{self.id}/members/{member.id}", "PATCH", {"json": modifs})
+		return await self.__bulk(members, request, skip, update, concurrency)
+
+	async def __bulk(self, members, request, skip, update, concurrency):
+		semaphore = asyncio.Semaphore(concurrency)
+		results = {}
+
+		async def run(member, path, method, kwargs):
+			async with semaphore:
+				try:
+					await self.__bot.api_async(path, method, **kwargs)
+				except Exception as error:
+					results[member.id] = error
+				else:
+					update(member)
+					results[member.id] = True
+
+		tasks = []
+		# the members of the cache by id, read once for all the ids
+		cache = None
+		for member in members:
+			known = True
+			if not isinstance(member, Member):
+				user_id = str(member)
+				if cache is None:
+					cache = {str(cached.id): cached for cached in self.members}
+				member = cache.get(user_id)
+				if not member:
+					# The member is not in the cache : nothing is known to skip the request
+					member = Member({"user":{"id":user_id},"guild_id":self.id}, self.__bot)
+					known = False
+			if member.id in results:
+				continue
+			if known and skip(member):
+				results[member.id] = False
+				continue
+			results[member.id] = None
+			tasks.append(run(member, *request(member)))
+
+		await asyncio.gather(*tasks)
+		return results
+
 	def count_prune(self, days=7, include_roles=[]):
 		
 		"""
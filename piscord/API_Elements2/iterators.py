@@ -0,0 +1,119 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+class PageIterator(ABC):
+
+	"""
+	Async iterator over a paginated route of the api
+
+	The pages are requested one after the other : while the elements of a page are used,
+	the next page is already requested, so at most two pages are kept in memory.
+	The elements are created (with 'factory') only when they are reached.
+	The subclasses define prepare, which reads the pages of their route.
+
+	limit:
+		The max number of elements, None for all the elements
+	"""
+
+	page_size = 100
+
+	def __init__(self, bot, path, factory, limit=None, params={}):
+		self.path = path
+		self.factory = factory
+		self.remaining = limit
+		self.params = dict(params)
+		self.page = []
+		self.next_page = None
+		self.started = False
+		self.finished = False
+		self.__bot = bot
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		if not self.started:
+			self.started = True
+			self.next_page = self.request()
+		while not self.page:
+			if self.next_page is None:
+				raise StopAsyncIteration
+			elements = await self.next_page
+			self.next_page = None
+			size = self.params["limit"]
+			full = len(elements) == size
+			elements = self.prepare(elements)
+			if self.remaining is not None:
+				self.remaining -= len(elements)
+			if full and elements and self.remaining != 0 and not self.finished:
+				self.next_page = self.request()
+			elements.reverse()
+			self.page = elements
+		return self.factory(self.page.pop())
+
+	def request(self):
+		if self.remaining is None:
+			self.params["limit"] = self.page_size
+		else:
+			self.params["limit"] = min(self.page_size, self.remaining)
+		return asyncio.ensure_future(self.__bot.api_async(self.path, "GET", params=dict(self.params)))
+
+	@abstractmethod
+	def prepare(self, elements):
+
+		"""
+		Return the elements of a page in the iteration order, and set the parameters of the next page
+		"""
+
+
+class HistoryIterator(PageIterator):
+
+	"""
+	Iterate over the messages of a channel
+
+	Messages are returned from the newest to the oldest,
+	or from the oldest to the newest if only 'after' is specified
+	"""
+
+	def __init__(self, bot, channel_id, factory, limit=None, before=None, after=None):
+		self.after = int(after) if after else None
+		self.oldest_first = after is not None and before is None
+		params = {}
+		if self.oldest_first:
+			params["after"] = after
+		elif before:
+			params["before"] = before
+		PageIterator.__init__(self, bot, f"/channels/{channel_id}/messages", factory, limit, params)
+
+	def prepare(self, messages):
+		messages.sort(key=lambda message: int(message["id"]), reverse=not self.oldest_first)
+		if self.oldest_first:
+			if messages:
+				self.params["after"] = messages[-1]["id"]
+			return messages
+		if self.after:
+			kept = [message for message in messages if int(message["id"]) > self.after]
+			if len(kept) != len(messages):
+				# the 'after' message is reached, no need of other pages
+				self.finished = True
+			messages = kept
+		if messages:
+			self.params["before"] = messages[-1]["id"]
+		return messages
+
+
+class MembersIterator(PageIterator):
+
+	"""
+	Iterate over the members of a guild, sorted by id
+	"""
+
+	page_size = 1000
+
+	def __init__(self, bot, guild_id, factory, limit=None, after=None):
+		PageIterator.__init__(self, bot, f"/guilds/{guild_id}/members", factory, limit, {"after":after or 0})
+
+	def prepare(self, members):
+		if members:
+			self.params["after"] = members[-1]["user"]["id"]
+		return members
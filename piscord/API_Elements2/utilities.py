@@ -1,3 +1,11 @@
+DISCORD_EPOCH = 1420070400000
+
+def snowflake_time(snowflake):
+	"""
+	Return the timestamp (in seconds) when a snowflake (a discord id) was created
+	"""
+	return ((int(snowflake) >> 22) + DISCORD_EPOCH) / 1000
+
 class Cache:
 	def __init__(self, func):
 		self.func = func
@@ -15,10 +23,11 @@ class API_Element:
 	def to_json(self):
 		output = {}
 		for x,y in self.__dict__.items():
-			if x.endswith("__bot"):
+			# the private attributes (the bot, caches...) are not sent
+			if x.startswith("_"):
 				continue
 			if y != None:
-				if type(y) == list:
+				if isinstance(y,list):
 					e=[]
 					for p in y:
 						if isinstance(p,API_Element):
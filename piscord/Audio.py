@@ -0,0 +1,463 @@
+import asyncio
+import ctypes
+import ctypes.util
+import inspect
+import io
+from abc import ABC, abstractmethod
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+"""
+The audio given to the voice connections : Opus frames of 20ms, at 48kHz in stereo
+The PCM audio is in signed 16 bits little endian samples, a frame is FRAME_SIZE bytes
+"""
+
+SAMPLING_RATE = 48000
+CHANNELS = 2
+FRAME_DURATION = 0.02
+FRAME_SAMPLES = 960
+FRAME_SIZE = FRAME_SAMPLES * CHANNELS * 2
+
+class OggReader:
+
+	"""
+	Read the packets of an Ogg stream, page by page, from an asyncio.StreamReader
+
+	Only the pages being read are in memory : a file is never entirely loaded.
+	A packet can be split in several segments of 255 bytes and continue on the next page,
+	it is returned once complete.
+
+	See https://tools.ietf.org/html/rfc3533 for the format of the pages
+	"""
+
+	def __init__(self, reader):
+		self.reader = reader
+
+	async def packets(self):
+		partial = b""
+		while True:
+			try:
+				header = await self.reader.readexactly(27)
+			except asyncio.IncompleteReadError:
+				return
+			if header[:4] != b"OggS":
+				raise ValueError("Invalid Ogg page")
+			table = await self.reader.readexactly(header[26])
+			body = await self.reader.readexactly(sum(table))
+
+			position = 0
+			start = 0
+			for size in table:
+				position += size
+				# a segment of 255 bytes means that the packet continues in the next segment
+				if size < 255:
+					yield partial + body[start:position]
+					partial = b""
+					start = position
+			partial += body[start:position]
+
+	def __aiter__(self):
+		return self.packets()
+
+
+async def ffmpeg_opus(source, bitrate=128, before_options=(), options=()):
+
+	"""
+	Encode an audio file (or url) in Opus with ffmpeg, and yield its frames while ffmpeg encodes them
+
+	source:
+		The path or url of the file
+	bitrate:
+		The bitrate of the audio, in kb/s
+	"""
+
+	try:
+		process = await asyncio.create_subprocess_exec(
+			"ffmpeg", *before_options, "-i", source, "-map_metadata", "-1",
+			"-f", "opus", "-c:a", "libopus", "-ar", str(SAMPLING_RATE), "-ac", str(CHANNELS),
+			"-b:a", f"{bitrate}k", "-application", "audio", "-frame_duration", "20", "-page_duration", "20000",
+			*options, "-loglevel", "warning", "pipe:1",
+			stdout=asyncio.subprocess.PIPE, stdin=asyncio.subprocess.DEVNULL
+		)
+	except FileNotFoundError:
+		raise ProcessLookupError("You should install ffmpeg to use voices")
+
+	try:
+		async for packet in OggReader(process.stdout):
+			# the two first packets are the headers of the Opus stream, not audio
+			if packet[:8] in (b"OpusHead", b"OpusTags"):
+				continue
+			yield packet
+	finally:
+		if process.returncode is None:
+			process.kill()
+			await process.wait()
+
+
+def require_numpy():
+	if numpy is None:
+		raise ImportError("You should install numpy to mix audio or change its volume : pip install numpy")
+
+
+class Encoder:
+
+	"""
+	Opus encoder, using the libopus library of the system with ctypes
+
+	bitrate:
+		The bitrate of the audio, in kb/s
+	"""
+
+	APPLICATION_AUDIO = 2049
+	SET_BITRATE = 4002
+	MAX_PACKET = 4000
+	lib = None
+
+	def __init__(self, bitrate=128):
+		lib = self.load()
+		error = ctypes.c_int()
+		self.encoder = lib.opus_encoder_create(SAMPLING_RATE, CHANNELS, self.APPLICATION_AUDIO, ctypes.byref(error))
+		if error.value:
+			raise RuntimeError(f"Opus error {error.value}")
+		lib.opus_encoder_ctl(self.encoder, self.SET_BITRATE, ctypes.c_int(bitrate * 1000))
+		self.output = ctypes.create_string_buffer(self.MAX_PACKET)
+
+	@classmethod
+	def load(cls):
+		if cls.lib is None:
+			path = ctypes.util.find_library("opus")
+			if path is None:
+				raise ImportError("You should install libopus to encode audio")
+			lib = ctypes.CDLL(path)
+			lib.opus_encoder_create.restype = ctypes.c_void_p
+			lib.opus_encoder_create.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+			lib.opus_encoder_ctl.argtypes = [ctypes.c_void_p, ctypes.c_int]
+			lib.opus_encode.restype = ctypes.c_int32
+			lib.opus_encode.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_int32]
+			lib.opus_encoder_destroy.argtypes = [ctypes.c_void_p]
+			cls.lib = lib
+		return cls.lib
+
+	def encode(self, pcm):
+
+		"""
+		Encode a PCM frame of 20ms (FRAME_SIZE bytes) and return the Opus frame
+		"""
+
+		size = self.lib.opus_encode(self.encoder, bytes(pcm), FRAME_SAMPLES, self.output, self.MAX_PACKET)
+		if size < 0:
+			raise RuntimeError(f"Opus error {size}")
+		return self.output.raw[:size]
+
+	def __del__(self):
+		if getattr(self, "encoder", None):
+			self.lib.opus_encoder_destroy(self.encoder)
+			self.encoder = None
+
+
+class Decoder:
+
+	"""
+	Opus decoder, using the libopus library of the system with ctypes
+	"""
+
+	def __init__(self):
+		lib = self.load()
+		error = ctypes.c_int()
+		self.decoder = lib.opus_decoder_create(SAMPLING_RATE, CHANNELS, ctypes.byref(error))
+		if error.value:
+			raise RuntimeError(f"Opus error {error.value}")
+		self.output = (ctypes.c_int16 * (FRAME_SAMPLES * 6 * CHANNELS))()
+
+	@staticmethod
+	def load():
+		lib = Encoder.load()
+		if not hasattr(lib, "decoder_loaded"):
+			lib.opus_decoder_create.restype = ctypes.c_void_p
+			lib.opus_decoder_create.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.POINTER(ctypes.c_int)]
+			lib.opus_decode.restype = ctypes.c_int
+			lib.opus_decode.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int32, ctypes.POINTER(ctypes.c_int16), ctypes.c_int, ctypes.c_int]
+			lib.opus_decoder_destroy.argtypes = [ctypes.c_void_p]
+			lib.decoder_loaded = True
+		return lib
+
+	def decode(self, frame):
+
+		"""
+		Decode an Opus frame and return the PCM audio
+
+		With None (a lost packet), libopus creates the audio of the missing frame from the previous frames
+		"""
+
+		lib = Encoder.lib
+		if frame is None:
+			samples = lib.opus_decode(self.decoder, None, 0, self.output, FRAME_SAMPLES, 0)
+		else:
+			samples = lib.opus_decode(self.decoder, bytes(frame), len(frame), self.output, FRAME_SAMPLES * 6, 0)
+		if samples < 0:
+			raise RuntimeError(f"Opus error {samples}")
+		return ctypes.string_at(self.output, samples * CHANNELS * 2)
+
+	def __del__(self):
+		if getattr(self, "decoder", None):
+			Encoder.lib.opus_decoder_destroy(self.decoder)
+			self.decoder = None
+
+
+class AudioSource(ABC):
+
+	"""
+	Base class of the sources of audio, read frame by frame : PCM frames of 20ms, or Opus frames if is_opus is True
+
+	A source is an async iterator of its frames, and can be given to Voice.play
+	"""
+
+	is_opus = False
+
+	@abstractmethod
+	async def read(self):
+
+		"""
+		Return the next frame, or b"" at the end of the audio
+		"""
+
+	def cleanup(self):
+		pass
+
+	async def frames(self):
+		try:
+			while True:
+				frame = await self.read()
+				if not frame:
+					return
+				yield frame
+		finally:
+			self.cleanup()
+
+	def __aiter__(self):
+		return self.frames()
+
+	async def opus(self, bitrate=128):
+
+		"""
+		Yield the frames encoded in Opus (see :class:`Encoder`)
+		"""
+
+		if self.is_opus:
+			async for frame in self:
+				yield frame
+			return
+		encoder = Encoder(bitrate)
+		async for frame in self:
+			yield encoder.encode(frame)
+
+
+class FFmpegOpusSource(AudioSource):
+
+	"""
+	Audio file (or url) encoded in Opus by ffmpeg, read while ffmpeg encodes it
+	"""
+
+	is_opus = True
+
+	def __init__(self, source, bitrate=128, before_options=(), options=()):
+		self.packets = ffmpeg_opus(source, bitrate, before_options, options)
+
+	async def read(self):
+		try:
+			return await self.packets.__anext__()
+		except StopAsyncIteration:
+			return b""
+
+	def cleanup(self):
+		asyncio.ensure_future(self.packets.aclose())
+
+
+class FFmpegPCMSource(AudioSource):
+
+	"""
+	Audio file (or url) decoded in PCM by ffmpeg, read frame by frame
+	"""
+
+	def __init__(self, source, before_options=(), options=()):
+		self.source = source
+		self.before_options = before_options
+		self.options = options
+		self.process = None
+
+	async def read(self):
+		if self.process is None:
+			try:
+				self.process = await asyncio.create_subprocess_exec(
+					"ffmpeg", *self.before_options, "-i", self.source, "-f", "s16le", "-ar", str(SAMPLING_RATE),
+					"-ac", str(CHANNELS), *self.options, "-loglevel", "warning", "pipe:1",
+					stdout=asyncio.subprocess.PIPE, stdin=asyncio.subprocess.DEVNULL
+				)
+			except FileNotFoundError:
+				raise ProcessLookupError("You should install ffmpeg to use voices")
+		try:
+			return await self.process.stdout.readexactly(FRAME_SIZE)
+		except asyncio.IncompleteReadError as error:
+			# the last frame is completed with silence
+			return error.partial + bytes(FRAME_SIZE - len(error.partial)) if error.partial else b""
+
+	def cleanup(self):
+		if self.process and self.process.returncode is None:
+			self.process.kill()
+
+
+class PCMSource(AudioSource):
+
+	"""
+	Raw PCM audio (signed 16 bits, 48kHz, stereo)
+
+	pcm:
+		The audio : bytes, a binary file object, or the path of a file
+	"""
+
+	def __init__(self, pcm):
+		if isinstance(pcm, (bytes, bytearray, memoryview)):
+			pcm = io.BytesIO(pcm)
+		elif isinstance(pcm, str):
+			pcm = open(pcm, "rb")
+		self.file = pcm
+
+	async def read(self):
+		frame = self.file.read(FRAME_SIZE)
+		if 0 < len(frame) < FRAME_SIZE:
+			frame += bytes(FRAME_SIZE - len(frame))
+		return frame
+
+	def cleanup(self):
+		self.file.close()
+
+
+class GeneratorSource(AudioSource):
+
+	"""
+	Audio created by a generator (or an async generator) of PCM frames of 20ms : bytes, or numpy int16 arrays
+	"""
+
+	def __init__(self, generator):
+		self.generator = generator
+
+	async def read(self):
+		try:
+			if inspect.isasyncgen(self.generator):
+				frame = await self.generator.__anext__()
+			else:
+				frame = next(self.generator)
+		except (StopIteration, StopAsyncIteration):
+			return b""
+		if numpy is not None and isinstance(frame, numpy.ndarray):
+			frame = frame.astype("<i2", copy=False).tobytes()
+		return frame
+
+
+class VolumeSource(AudioSource):
+
+	"""
+	Change the volume of a PCM source (needs numpy)
+
+	volume:
+		The factor applied to the samples, 1.0 for the original volume. Can be changed during the audio
+	"""
+
+	def __init__(self, source, volume=1.0):
+		require_numpy()
+		self.source = source
+		self.volume = volume
+
+	async def read(self):
+		frame = await self.source.read()
+		if not frame or self.volume == 1.0:
+			return frame
+		samples = numpy.frombuffer(frame, "<i2") * self.volume
+		return numpy.clip(samples, -32768, 32767).astype("<i2").tobytes()
+
+	def cleanup(self):
+		self.source.cleanup()
+
+
+class Mixer(AudioSource):
+
+	"""
+	Mix several PCM sources (needs numpy)
+
+	Each frame adds the frames of the sources, multiplied by their volume, then by the gain,
+	and clips the result to 16 bits : a frame is computed with a few numpy operations, for all its samples.
+
+		mixer = Mixer()
+		mixer.add(FFmpegPCMSource("music.mp3"), volume=0.3)
+		voice.play(mixer)
+		...
+		mixer.add(FFmpegPCMSource("announce.mp3"))
+
+	gain:
+		The volume of the mix
+	keep_alive:
+		If True, the mixer gives silence when it has no sources, instead of ending the audio
+	"""
+
+	def __init__(self, gain=1.0, keep_alive=False):
+		require_numpy()
+		self.gain = gain
+		self.keep_alive = keep_alive
+		self.sources = {}
+		self.mix = numpy.zeros(FRAME_SAMPLES * CHANNELS, numpy.float32)
+
+	def add(self, source, volume=1.0):
+		self.sources[source] = volume
+
+	def set_volume(self, source, volume):
+		self.sources[source] = volume
+
+	def remove(self, source):
+		if self.sources.pop(source, None) is not None:
+			source.cleanup()
+
+	async def read(self):
+		sources = list(self.sources.items())
+		if not sources:
+			return bytes(FRAME_SIZE) if self.keep_alive else b""
+		frames = await asyncio.gather(*(source.read() for source, volume in sources))
+		mix = self.mix
+		mix.fill(0)
+		ended = 0
+		for (source, volume), frame in zip(sources, frames):
+			if not frame:
+				self.remove(source)
+				ended += 1
+				continue
+			if len(frame) < FRAME_SIZE:
+				# the last frame of a source can be shorter : completed with silence
+				frame = bytes(frame) + bytes(FRAME_SIZE - len(frame))
+			elif len(frame) > FRAME_SIZE:
+				raise ValueError(f"A PCM frame has {FRAME_SIZE} bytes, not {len(frame)}")
+			mix += numpy.frombuffer(frame, "<i2") * numpy.float32(volume)
+		if ended == len(sources) and not self.keep_alive:
+			return b""
+		if self.gain != 1.0:
+			mix *= self.gain
+		return numpy.clip(mix, -32768, 32767).astype("<i2").tobytes()
+
+	def cleanup(self):
+		for source in list(self.sources):
+			self.remove(source)
+
+
+def opus_frames(source, bitrate=128):
+
+	"""
+	Return the Opus frames of a source given to Voice.play : the path or url of a file,
+	an :class:`AudioSource`, or an async iterator of Opus frames
+	"""
+
+	if isinstance(source, str):
+		source = FFmpegOpusSource(source, bitrate)
+	if isinstance(source, AudioSource):
+		return source.opus(bitrate)
+	return source
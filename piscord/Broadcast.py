@@ -0,0 +1,64 @@
+import aiohttp
+import asyncio
+import json
+import time
+
+from .Errors import *
+
+class BroadcastResult:
+
+	"""
+	The result of Bot.broadcast
+
+	sent:
+		Dict of the messages sent (dicts), by channel id
+	failed:
+		Dict of the errors, by channel id
+	duration:
+		The duration of the broadcast, in seconds
+	"""
+
+	def __init__(self):
+		self.sent = {}
+		self.failed = {}
+		self.duration = 0.0
+
+	def __repr__(self):
+		return f"BroadcastResult(sent={len(self.sent)}, failed={len(self.failed)}, duration={self.duration:.2f}s)"
+
+	@property
+	def success(self):
+		return not self.failed
+
+
+async def broadcast(bot, channel_ids, content=None, embed=None, concurrency=50, retry_policy=None, **kwargs):
+
+	"""
+	Send a message in many channels (see Bot.broadcast)
+	"""
+
+	payload = {key: value for key, value in kwargs.items() if value is not None}
+	if content is not None:
+		payload["content"] = content
+	if embed is not None:
+		payload["embed"] = embed.to_json() if hasattr(embed, "to_json") else embed
+	# the message is serialized once, the same bytes are sent in every channel
+	body = json.dumps(payload).encode()
+	headers = {**bot.headers(), "Content-Type": "application/json"}
+
+	result = BroadcastResult()
+	semaphore = asyncio.Semaphore(concurrency)
+	start = time.monotonic()
+
+	async def send(session, channel_id):
+		async with semaphore:
+			try:
+				result.sent[channel_id] = await bot.api_call(f"/channels/{channel_id}/messages", "POST",
+					session=session, retry_policy=retry_policy, data=body, headers=headers)
+			except Error as error:
+				result.failed[channel_id] = error
+
+	async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=concurrency)) as session:
+		await asyncio.gather(*(send(session, channel_id) for channel_id in dict.fromkeys(channel_ids)))
+	result.duration = time.monotonic() - start
+	return result
@@ -3,16 +3,107 @@ class Error(Exception):
 	def __str__(self):
 		return self.error
 
-class PermissionsError(Error):
-	error = "You do not have permission to do this action"
+class HTTPException(Error):
+
+	"""
+	Error of a request to the api
+
+	status:
+		The HTTP status of the response
+	code:
+		The json error code of discord : https://discord.com/developers/docs/topics/opcodes-and-status-codes#json
+	route:
+		The method and the path of the request
+	retry_after:
+		The time to wait before sending the request again (for the rate limits), in seconds
+	"""
 
-class BadRequestError(Error):
+	error = "The request failed"
+
+	def __init__(self, status=None, code=None, route=None, message=None, retry_after=None):
+		self.status = status
+		self.code = code
+		self.route = route
+		self.retry_after = retry_after
+		if message:
+			self.error = f"{self.error} : {message}"
+		if code:
+			self.error = f"{self.error} (code {code})"
+		if route:
+			self.error = f"{self.error} - {status} {route}"
+
+class BadRequestError(HTTPException):
 	error = "Your query was incomplete or bad"
 
+class PermissionsError(HTTPException):
+	error = "You do not have permission to do this action"
+
+class NotFound(HTTPException):
+	error = "The resource was not found"
+
+class RateLimited(HTTPException):
+	error = "You are rate limited"
+
+class ServerError(HTTPException):
+	error = "Discord server error"
+
+HTTP_ERRORS = {
+	400: BadRequestError,
+	403: PermissionsError,
+	404: NotFound,
+	429: RateLimited
+}
+
+def http_error(status, route=None, data=None, retry_after=None):
+
+	"""
+	Create the :class:`HTTPException` of a response, from its status and its json
+	"""
+
+	if not isinstance(data, dict):
+		data = {}
+	cls = ServerError if status >= 500 else HTTP_ERRORS.get(status, HTTPException)
+	return cls(status, data.get("code"), route, data.get("message"), retry_after)
+
 class TokenError(Error):
 	error = "The token is not valid"
 
 class ConnexionError(Error):
 	error = "Connexion Error : {}"
 	def __init__(self, error):
-		self.error = self.error.format(error)
\ No newline at end of file
+		self.error = self.error.format(error)
+
+class FileError(Error):
+	error = "The file can't be sent : {}"
+	def __init__(self, error):
+		self.error = self.error.format(error)
+
+class EmbedError(Error):
+	error = "Invalid embed : {}"
+	def __init__(self, error):
+		self.error = self.error.format(error)
+
+class PurgeError(Error):
+	error = "The purge stopped after {} deleted messages : {}"
+	def __init__(self, deleted, errors):
+		self.deleted = deleted
+		self.errors = errors
+		self.error = self.error.format(deleted, errors[0])
+
+class CommandError(Error):
+	error = "The command can't be used"
+
+class ArgumentError(CommandError):
+	error = "Invalid argument {} : {}"
+	def __init__(self, argument, error):
+		self.argument = argument
+		self.error = self.error.format(argument, error)
+
+class CooldownError(CommandError):
+	error = "The command is in cooldown, retry in {:.2f}s"
+	def __init__(self, retry_after):
+		self.retry_after = retry_after
+		self.error = self.error.format(retry_after)
+
+class MaxConcurrencyError(CommandError):
+	error = "The command is already running the max number of times"
\ No newline at end of file
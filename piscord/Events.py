@@ -14,7 +14,7 @@ Thus, it is easier to work with the 'Events' class, since we can iterate over al
 I use a namedtuple so that the code is more understandable in the 'Bot' class (c.f 'Bot.py').
 """
 
-event_list_item = namedtuple("event_list_item", ["name", "function"])
+event_list_item = namedtuple("event_list_item", ["name", "function", "cache"])
 
 class EventsMeta(type):
 	def __getitem__(cls, name):
@@ -28,13 +28,18 @@ class Events(metaclass=EventsMeta):
 	__EVENTS_LIST__ = {}
 
 	@classmethod
-	def def_event(cls, event, event_name):
+	def def_event(cls, event, event_name, cache=False):
 		def add_event(function):
-			cls.__EVENTS_LIST__[event] = event_list_item(event_name, function)
+			cls.__EVENTS_LIST__[event] = event_list_item(event_name, function, cache)
 		return add_event
 
-def def_event(event, event_name):
-	return Events.def_event(event, event_name)
+"""
+'cache' is True for the events which update the cache of the bot (guilds, channels, members...) :
+they are always created, the others are only created if the user defined the event.
+"""
+
+def def_event(event, event_name, cache=False):
+	return Events.def_event(event, event_name, cache)
 
 
 """
@@ -44,7 +49,7 @@ def def_event(event, event_name):
 """
 
 
-@def_event("READY", "on_ready")
+@def_event("READY", "on_ready", cache=True)
 class Event(Bot_Element):
 
 	def __init__(self, bot, data):
@@ -55,7 +60,7 @@ class Event(Bot_Element):
 			setattr(bot, x, y)
 
 
-@def_event("GUILD_CREATE", "guild_create")
+@def_event("GUILD_CREATE", "guild_create", cache=True)
 class Event(Guild):
 
 	def __init__(self, bot, data):
@@ -67,7 +72,7 @@ class Event(Guild):
 		bot.guilds.append(self)
 
 
-@def_event("GUILD_UPDATE", "guild_update")
+@def_event("GUILD_UPDATE", "guild_update", cache=True)
 class Event(Guild):
 
 	def __init__(self, bot, data):
@@ -79,7 +84,7 @@ class Event(Guild):
 				setattr(guild, x, y)
 
 
-@def_event("GUILD_DELETE", "guild_delete")
+@def_event("GUILD_DELETE", "guild_delete", cache=True)
 class Event:
 
 	def __init__(self, bot, data):
@@ -184,7 +189,7 @@ class Event:
 				self.private_channels, id=self.channel_id)
 
 
-@def_event("CHANNEL_CREATE", "channel_create")
+@def_event("CHANNEL_CREATE", "channel_create", cache=True)
 class Event(Channel):
 
 	def __init__(self, bot, data):
@@ -199,7 +204,7 @@ class Event(Channel):
 			self.guild.channels.append(self)
 
 
-@def_event("CHANNEL_UPDATE", "channel_update")
+@def_event("CHANNEL_UPDATE", "channel_update", cache=True)
 class Event(Channel):
 
 	def __init__(self, bot, data):
@@ -207,7 +212,7 @@ class Event(Channel):
 		bot.set_element(self.guild.channels, self)
 
 
-@def_event("CHANNEL_DELETE", "channel_delete")
+@def_event("CHANNEL_DELETE", "channel_delete", cache=True)
 class Event(Channel):
 
 	def __init__(self, bot, data):
@@ -216,7 +221,7 @@ class Event(Channel):
 			bot.get_element(self.guild.channels, id=self.id))
 
 
-@def_event("GUILD_MEMBER_ADD", "member_join")
+@def_event("GUILD_MEMBER_ADD", "member_join", cache=True)
 class Event(Member):
 
 	def __init__(self, bot, data):
@@ -224,7 +229,7 @@ class Event(Member):
 		self.guild.members.append(self)
 
 
-@def_event("GUILD_MEMBER_UPDATE", "member_update")
+@def_event("GUILD_MEMBER_UPDATE", "member_update", cache=True)
 class Event(Member):
 
 	def __init__(self, bot, data):
@@ -232,7 +237,7 @@ class Event(Member):
 		bot.set_element(self.guild.members, self)
 
 
-@def_event("GUILD_MEMBER_REMOVE", "member_quit")
+@def_event("GUILD_MEMBER_REMOVE", "member_quit", cache=True)
 class Event(User):
 
 	def __init__(self, bot, data):
@@ -245,7 +250,7 @@ class Event(User):
 			self.guild.members.remove(__member)
 
 
-@def_event("GUILD_ROLE_CREATE", "role_create")
+@def_event("GUILD_ROLE_CREATE", "role_create", cache=True)
 class Event(Role):
 
 	def __init__(self, bot, data):
@@ -254,7 +259,7 @@ class Event(Role):
 		self.guild.roles.append(self)
 
 
-@def_event("GUILD_ROLE_UPDATE", "role_update")
+@def_event("GUILD_ROLE_UPDATE", "role_update", cache=True)
 class Event(Role):
 	def __init__(self, bot, data):
 		Role.__init__(
@@ -262,7 +267,7 @@ class Event(Role):
 		bot.set_element(self.guild.roles, self)
 
 
-@def_event("GUILD_ROLE_DELETE", "role_delete")
+@def_event("GUILD_ROLE_DELETE", "role_delete", cache=True)
 class Event:
 
 	def __init__(self, bot, data):
@@ -276,7 +281,7 @@ class Event:
 		self.guild.roles.remove(role)
 
 
-@def_event("INVITE_CREATE", "invite_create")
+@def_event("INVITE_CREATE", "invite_create", cache=True)
 class Event(Invite):
 
 	def __init__(self, bot, data):
@@ -290,7 +295,7 @@ class Event(Invite):
 		self.channel.invites.append(self)
 
 
-@def_event("INVITE_DELETE", "invite_delete")
+@def_event("INVITE_DELETE", "invite_delete", cache=True)
 class Event(Invite):
 
 	def __init__(self, bot, data):
@@ -377,7 +382,7 @@ class Event:
 
 
 """
-	TODO : Voices
+The voice connections of the bot are updated by the VoiceManager (see Voice.py)
 """
 
 @def_event("VOICE_STATE_UPDATE","on_voice_update")
@@ -399,33 +404,15 @@ class Event:
 		else:
 			self.on_join = False
 			self.on_leave = True
-		self.__bot = bot
-
-	async def run(self):
-		if self.member.id == self.__bot.user.id:
-			if self.voice:
-				if not self.voice.session_id:
-					self.voice.session_id = self.session_id
-					self.voice.state += 1
-					if self.voice.state == 2:
-						await self.voice.run()
 
 @def_event("VOICE_SERVER_UPDATE","")
 class Event:
 
 	def __init__(self, bot, data):
-		self.voice = bot.voices[data["guild_id"]]
+		self.voice = bot.voices.get(data["guild_id"])
 		self.token = data["token"]
 		self.endpoint = data["endpoint"]
 
-	async def run(self):
-		if not self.voice.token:
-			self.voice.token = self.token
-			self.voice.endpoint = self.endpoint.replace(":80","")
-			self.voice.state += 1
-			if self.voice.state == 2:
-				await self.voice.run()
-
 
 """class Events2:
 	def __init__(self):
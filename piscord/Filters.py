@@ -0,0 +1,42 @@
+"""
+Filters of the events, to use with Bot.event :
+
+	@bot.event("on_message", filter=Filters.all_of(Filters.in_guilds(guild_id), Filters.not_bot))
+	def on_message(message):
+		...
+
+A filter is called with the raw data of the event (the dict sent by discord), before the event is created :
+when it returns False, the event is not created and the function is not called.
+"""
+
+def in_guilds(*guild_ids):
+	guild_ids = set(guild_ids)
+	return lambda data: data.get("guild_id") in guild_ids
+
+def in_channels(*channel_ids):
+	channel_ids = set(channel_ids)
+	return lambda data: data.get("channel_id") in channel_ids
+
+def from_users(*user_ids):
+	user_ids = set(user_ids)
+	return lambda data: author_id(data) in user_ids
+
+def not_bot(data):
+
+	"""
+	Reject the events of a bot (messages and reactions)
+	"""
+
+	user = data.get("author") or data.get("member", {}).get("user") or {}
+	return not user.get("bot")
+
+def author_id(data):
+	if "author" in data:
+		return data["author"]["id"]
+	return data.get("user_id") or data.get("user", {}).get("id")
+
+def all_of(*filters):
+	return lambda data: all(check(data) for check in filters)
+
+def any_of(*filters):
+	return lambda data: any(check(data) for check in filters)
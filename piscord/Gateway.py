@@ -1,6 +1,7 @@
 import websockets
 import json
 import asyncio
+import time
 
 from .Errors import TokenError,ConnexionError
 
@@ -128,4 +129,143 @@ class Gateway:
 		self.heartbeat.cancel()
 
 	def stop(self):
-		asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
\ No newline at end of file
+		asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
+
+class VoiceGateway:
+
+	"""
+	The gateway of a voice server (version 4)
+
+	The heartbeats (op 3) send a nonce, which the server sends back (op 6) : the time between them is the latency.
+	If a heartbeat is not acknowledged before the next one, the connection is considered dead and closed.
+	When the connection is lost, the session is resumed (op 7) on a new connection, without identifying again :
+	the UDP connection is not changed, and the audio continues during the reconnection.
+	If the session can't be resumed, the gateway identifies again (and the server sends op 2 again).
+
+	latency:
+		The time (in seconds) between the last heartbeat and its acknowledgement
+	"""
+
+	# The close codes after which the session is over : 4004 (authentication failed), 4014 (disconnected from the channel)
+	END_CODES = (4004, 4014)
+	# The close codes after which the session can't be resumed : 4006 (invalid session), 4009 (session timeout)
+	IDENTIFY_CODES = (4006, 4009)
+
+	def __init__(self, url, server_id, user_id, session_id, token):
+		self.url = url
+		self.server_id = server_id
+		self.user_id = user_id
+		self.session_id = session_id
+		self.token = token
+		self.websocket = None
+		self.heartbeat = None
+		self.interval = None
+		self.nonce = None
+		self.sent_at = None
+		self.latency = None
+		self.close_code = None
+		self.loop = None
+		self._running = False
+
+	def identify_payload(self):
+		return {
+			"op": 0,
+			"d": {
+				"server_id": self.server_id,
+				"user_id": self.user_id,
+				"session_id": self.session_id,
+				"token": self.token
+		}}
+
+	def resume_payload(self):
+		return {
+			"op": 7,
+			"d": {
+				"server_id": self.server_id,
+				"session_id": self.session_id,
+				"token": self.token
+		}}
+
+	async def connect(self, attempts=5):
+
+		"""
+		Connect to the voice gateway, and yield the messages of the server until the gateway is stopped,
+		through the resumes of the session
+		"""
+
+		self._running = True
+		self.loop = asyncio.get_running_loop()
+		resume = False
+		failures = 0
+		while self._running:
+			try:
+				self.websocket = await websockets.connect(self.url, ping_interval = None)
+			except OSError as error:
+				failures += 1
+				if failures > attempts:
+					raise ConnexionError(error)
+				await asyncio.sleep(min(2 ** failures, 30))
+				continue
+
+			try:
+				async for data in self.__receive(resume):
+					failures = 0
+					yield data
+				self.close_code = self.websocket.close_code
+			except websockets.exceptions.ConnectionClosed as error:
+				received = getattr(error, "rcvd", None)
+				self.close_code = received.code if received else getattr(error, "code", 1006)
+			finally:
+				if self.heartbeat:
+					self.heartbeat.cancel()
+
+			if self.close_code == 4004:
+				raise TokenError()
+			if self.close_code in self.END_CODES:
+				break
+			resume = self.close_code not in self.IDENTIFY_CODES
+
+	async def __receive(self, resume):
+		hello = json.loads(await self.websocket.recv())
+		self.interval = hello["d"]["heartbeat_interval"] / 1000
+		self.nonce = None
+		self.heartbeat = asyncio.create_task(self.__heartbeat())
+		await self.send(self.resume_payload() if resume else self.identify_payload())
+		async for message in self.websocket:
+			data = json.loads(message)
+			if data["op"] == 6:
+				self.acknowledge(data["d"])
+			yield data
+
+	async def __heartbeat(self):
+		while True:
+			await asyncio.sleep(self.interval)
+			if self.nonce is not None:
+				# the last heartbeat was not acknowledged : the connection is dead
+				await self.websocket.close(4000)
+				return
+			self.nonce = int(time.time() * 1000)
+			self.sent_at = self.loop.time()
+			await self.send({"op": 3, "d": self.nonce})
+
+	def acknowledge(self, nonce):
+		if nonce == self.nonce:
+			self.latency = self.loop.time() - self.sent_at
+			self.nonce = None
+
+	async def send(self, payload):
+		await self.websocket.send(json.dumps(payload))
+
+	async def _stop(self):
+		if self.websocket:
+			await self.websocket.close()
+
+	def stop(self):
+
+		"""
+		Close the connection, without resuming it
+		"""
+
+		self._running = False
+		if self.loop and self.websocket:
+			asyncio.run_coroutine_threadsafe(self._stop(), self.loop)
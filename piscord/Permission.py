@@ -63,6 +63,9 @@ MANAGE_EMOJIS:
 	Permission to create/edit emojis
 """
 
+import threading
+from collections import OrderedDict
+
 class Perm(int):
 
 	def __new__(cls, value):
@@ -125,4 +128,137 @@ CHANGE_NICKNAME = Perm(2**26)
 MANAGE_NICKNAMES = Perm(2**27)
 MANAGE_ROLES = Perm(2**28)
 MANAGE_WEBHOOKS = Perm(2**29)
-MANAGE_EMOJIS = Perm(2**30)
\ No newline at end of file
+MANAGE_EMOJIS = Perm(2**30)
+ALL_PERMISSIONS = Perm(2**31 - 1)
+
+def compute_permissions(guild, member, channel=None):
+
+	"""
+	Compute the permissions of a member in a guild, or in a channel of the guild
+
+	The permissions are the ones of @everyone and of the roles of the member.
+	The owner and the administrators have all the permissions.
+	In a channel, the overwrites are then applied : @everyone, then the roles, then the member.
+
+	Return :class:`Perm`
+	"""
+
+	if str(member.id) == str(guild.owner_id):
+		return ALL_PERMISSIONS
+
+	roles = {role.id: role for role in guild.roles}
+	everyone = roles.get(guild.id)
+	permissions = everyone.permissions.real if everyone else 0
+	for role_id in member.roles_id:
+		if role_id in roles:
+			permissions |= roles[role_id].permissions.real
+
+	if permissions & ADMINISTRATOR:
+		return ALL_PERMISSIONS
+	if channel is None:
+		return Perm(permissions)
+
+	overwrites = {overwrite.id: overwrite for overwrite in channel.permission_overwrites}
+	if guild.id in overwrites:
+		permissions &= ~overwrites[guild.id].deny.real
+		permissions |= overwrites[guild.id].allow.real
+
+	allow = deny = 0
+	for role_id in member.roles_id:
+		if role_id in overwrites:
+			allow |= overwrites[role_id].allow.real
+			deny |= overwrites[role_id].deny.real
+	permissions = (permissions & ~deny) | allow
+
+	if member.id in overwrites:
+		permissions &= ~overwrites[member.id].deny.real
+		permissions |= overwrites[member.id].allow.real
+
+	return Perm(permissions)
+
+
+class PermissionsCache:
+
+	"""
+	Cache of the computed permissions, by guild, channel and member
+
+	It keeps the permissions of the 'maxsize' last used (guild, channel, member), the least recently used are removed.
+	Bot.dispatch gives it the raw events (see PermissionsCache.update) : the permissions of a guild are cleared
+	when its roles or channels are updated, and the ones of a member when the member is updated
+	"""
+
+	def __init__(self, maxsize=10000):
+		self.maxsize = maxsize
+		self.entries = OrderedDict()
+		# the keys of the entries by guild, to clear a guild without reading the other entries
+		self.guilds = {}
+		self.lock = threading.Lock()
+		self.invalidations = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, guild, member, channel=None):
+		key = (guild.id, channel.id if channel else None, member.id)
+		with self.lock:
+			permissions = self.entries.get(key)
+			if permissions is not None:
+				self.entries.move_to_end(key)
+				return permissions
+			invalidations = self.invalidations
+		permissions = compute_permissions(guild, member, channel)
+		with self.lock:
+			if invalidations != self.invalidations:
+				# the cache was invalidated during the computation, the result may be outdated
+				return permissions
+			self.entries[key] = permissions
+			self.guilds.setdefault(key[0], set()).add(key)
+			while len(self.entries) > self.maxsize:
+				self.remove(next(iter(self.entries)))
+		return permissions
+
+	def remove(self, key):
+		self.entries.pop(key, None)
+		keys = self.guilds.get(key[0])
+		if keys is not None:
+			keys.discard(key)
+			if not keys:
+				del self.guilds[key[0]]
+
+	def invalidate(self, guild_id, match=lambda key: True):
+		with self.lock:
+			self.invalidations += 1
+			for key in [key for key in self.guilds.get(guild_id, ()) if match(key)]:
+				self.remove(key)
+
+	def invalidate_guild(self, guild_id):
+		self.invalidate(guild_id)
+
+	def invalidate_channel(self, guild_id, channel_id):
+		self.invalidate(guild_id, lambda key: key[1] == channel_id)
+
+	def invalidate_member(self, guild_id, member_id):
+		self.invalidate(guild_id, lambda key: key[2] == member_id)
+
+	def update(self, data):
+
+		"""
+		Clear the permissions changed by a raw event of the gateway
+		"""
+
+		event = data["t"]
+		if event not in INVALIDATING_EVENTS:
+			return
+		d = data["d"]
+		if event.startswith("GUILD_ROLE_"):
+			self.invalidate_guild(d["guild_id"])
+		elif event.startswith("GUILD_MEMBER_"):
+			self.invalidate_member(d["guild_id"], d["user"]["id"])
+		elif event.startswith("CHANNEL_"):
+			self.invalidate_channel(d.get("guild_id"), d["id"])
+		else:
+			self.invalidate_guild(d["id"])
+
+
+INVALIDATING_EVENTS = {"GUILD_CREATE", "GUILD_UPDATE", "GUILD_DELETE", "CHANNEL_UPDATE", "CHANNEL_DELETE",
+	"GUILD_MEMBER_UPDATE", "GUILD_MEMBER_REMOVE", "GUILD_ROLE_UPDATE", "GUILD_ROLE_DELETE"}
@@ -1,12 +1,17 @@
 import aiohttp
 import asyncio
-from threading import Thread
+from threading import Lock, Thread
 
 from .Events import Events
 from .Errors import *
 from .API_Elements2 import *
 from .Voice import *
 from .Gateway import *
+from .RateLimit import RateLimiter, RetryPolicy, send_request
+from .Permission import PermissionsCache
+from .Stream import EventStream
+from .Sinks import EventForwarder
+from .Broadcast import broadcast
 
 class Utility:
 	@staticmethod
@@ -52,18 +57,42 @@ class Bot(Thread,Utility,Bot_Element):
 		self.token=token
 		self.api_sleep = api_sleep
 		self.events = {}
-		self.in_wait_voices = []
+		self.filters = {}
+		self.fallbacks = {}
+		self.waiters = {}
+		self.waiters_lock = Lock()
+		self.streams = set()
+		self.forwarders = []
 		self.presence = {"op": 3,"d": {"game":None,"status":None,"afk":False,"since":0}}
 		self.gateway = None
 		self.shards = shards
+		self.ratelimiter = RateLimiter()
+		self.retry_policy = RetryPolicy()
+		self.permissions_cache = PermissionsCache()
+		self.voice_manager = VoiceManager(self)
+
+	def event(self, arg=None, filter=None):
+
+		"""
+		Decorator to define an event, by its name or the name of the function
+
+		filter:
+			Function called with the raw data of the event (see :mod:`piscord.Filters`) :
+			if it returns False, the event is ignored, without creating its objects
+		"""
 
-	def event(self, arg):
 		def add_event(function):
-			self.events[arg]=function
+			name = arg or function.__name__
+			self.events[name]=function
+			if filter:
+				self.filters[name] = filter
+			else:
+				self.filters.pop(name, None)
+			return function
 
-		if type(arg) == str:
+		if arg is None or type(arg) == str:
 			return add_event
-		self.events[arg.__name__] = arg
+		return add_event(arg)
 
 	def get_element(self, element, **kwargs):
 		try:
@@ -84,44 +113,103 @@ class Bot(Thread,Utility,Bot_Element):
 					return
 		except:...
 
-	async def api_call(self, path, method="GET", **kwargs):
-		if "headers" in kwargs:
-			headers = kwargs["headers"]
-			del kwargs["headers"]
-		else:
-			headers = {
-				"Authorization": f"Bot {self.token}",
-				"User-Agent": "Bot"
-			}
+	async def api_call(self, path, method="GET", files=None, session=None, retry_policy=None, **kwargs):
+
+		"""
+		Send a request to the api, and return the json of the response (None if there is no content)
 
+		Raise a :class:`HTTPException` if the request failed (BadRequestError, PermissionsError, NotFound, RateLimited, ServerError),
+		or a :class:`ConnexionError` if discord can't be reached, once the retries of the retry policy are done.
+
+		session:
+			The aiohttp.ClientSession to use, to keep the connections open between requests.
+			By default, a session is created for the request
+		retry_policy: :class:`RetryPolicy`
+			By default, Bot.retry_policy
+		"""
+
+		headers = kwargs.pop("headers", None)
+		if headers is None:
+			headers = self.headers()
+		policy = retry_policy or self.retry_policy
+		if session is not None:
+			return await send_request(self.ratelimiter, policy, session, self.api_url, path, method, headers, files, **kwargs)
 		async with aiohttp.ClientSession() as session:
-			async with session.request(method, self.api_url+path, headers=headers, **kwargs) as response:
-				try:
-					assert 200 <= response.status < 300
-					if response.status in [200,201]:
-						return await response.json()
-				except AssertionError:
-					if response.status == 400:
-						return BadRequestError()
-					elif response.status == 403:
-						return PermissionsError()
-					elif response.status == 429:
-						pass
-					else:
-						return Error()
-				except Exception:
-					return Error()
+			return await send_request(self.ratelimiter, policy, session, self.api_url, path, method, headers, files, **kwargs)
+
+	def headers(self):
+		return {
+			"Authorization": f"Bot {self.token}",
+			"User-Agent": "Bot",
+			"X-RateLimit-Precision": "millisecond"
+		}
 
 	def api(self, path, method="GET", **kwargs):
 		loop = asyncio.new_event_loop()
-		output = loop.run_until_complete(self.api_call(path,method,**kwargs))
-		loop.run_until_complete(asyncio.sleep(self.api_sleep))
-		loop.close()
-		if output and isinstance(output,Error):
-			raise output
-		return output
+		try:
+			return loop.run_until_complete(self.api_call(path,method,**kwargs))
+		finally:
+			loop.run_until_complete(asyncio.sleep(self.api_sleep))
+			loop.close()
+
+	async def api_async(self, path, method="GET", **kwargs):
+
+		"""
+		Same as Bot.api, but to be awaited in a running event loop
+		The waits are done by the rate limiter, instead of api_sleep
+		"""
+
+		return await self.api_call(path,method,**kwargs)
+
+	def broadcast(self, channel_ids, content=None, embed=None, concurrency=50, retry_policy=None, **kwargs):
+
+		"""
+		Send the same message in many channels, and return a :class:`BroadcastResult`
+
+		The message is converted to json once, and sent in the channels at the same time (up to 'concurrency' requests),
+		within the rate limits of the channels and the global rate limit of the bot.
+		As for every POST, the 429 responses and the requests which could not be sent are retried,
+		but not the server errors : discord may have created the message before the error.
+
+		channel_ids:
+			The ids of the channels
+		content:
+			The content of the message
+		embed: :class:`Embed`
+			The embed of the message, an Embed or a dict
+		retry_policy: :class:`RetryPolicy`
+			By default, Bot.retry_policy. To retry the server errors, use a policy with "POST" in its methods :
+			the message can then be sent twice in a channel
+		kwargs:
+			The other parameters of the message : https://discord.com/developers/docs/resources/channel#create-message
+		"""
+
+		return self.run_coroutine(self.broadcast_async(channel_ids, content, embed, concurrency, retry_policy, **kwargs))
+
+	async def broadcast_async(self, channel_ids, content=None, embed=None, concurrency=50, retry_policy=None, **kwargs):
+
+		"""
+		Same as Bot.broadcast, to be awaited in a running event loop
+		"""
+
+		return await broadcast(self, channel_ids, content, embed, concurrency, retry_policy, **kwargs)
+
+	def run_coroutine(self, coroutine):
+
+		"""
+		Run a coroutine in a new event loop and return its result, as Bot.api does for a request
+		"""
+
+		loop = asyncio.new_event_loop()
+		try:
+			return loop.run_until_complete(coroutine)
+		finally:
+			loop.close()
 
 	async def begin(self):
+		for forwarder in self.forwarders:
+			if forwarder.task is None:
+				forwarder.start()
 		response = await self.api_call("/gateway")
 		await self.__main(response["url"])
 
@@ -131,23 +219,148 @@ class Bot(Thread,Utility,Bot_Element):
 		async for data in gateway.connect(shards = self.shards):
 			if data["op"] == 0:
 				if data["t"] in ("VOICE_SERVER_UPDATE", "VOICE_STATE_UPDATE"):
-					pass
-				if data["t"] in Events:
-					# "t" is the event name, i.e 'MESSAGE_CREATE', 'MESSAGE_REACTION_ADD', ...
-					event = Events[data["t"]]
-					# get the corresponding 'Event' class, and create a new instance of it.
-					output = event.function(self,data["d"])
-					# it the event is defined by the user, then run it in a separate thread
-					if event.name in self.events:
-						thread = Thread(target=self.events[event.name],args=(output,))
-						thread.start()
-			if self.in_wait_voices:
-				for voice in self.in_wait_voices:
-					if voice["guild_id"] not in self.voices:
-						x = Voice(voice,self)
-						self.voices[voice["guild_id"]] = x
-						asyncio.create_task(x.run())
-				self.in_wait_voices = []
+					self.voice_manager.update(data)
+				self.dispatch(data)
+
+	def dispatch(self, data):
+
+		"""
+		Create the event of a dispatch payload of the gateway, and call the function of the user
+		"""
+
+		for stream in tuple(self.streams):
+			stream.feed(data)
+		if data["t"] not in Events:
+			return
+		# "t" is the event name, i.e 'MESSAGE_CREATE', 'MESSAGE_REACTION_ADD', ...
+		event = Events[data["t"]]
+		function = self.events.get(event.name)
+		if function and event.name in self.filters and not self.filters[event.name](data["d"]):
+			# the function used for the events rejected by the filter, if any (the commands of Handler)
+			function = self.fallbacks.get(event.name)
+		waiting = event.name in self.waiters
+		# the objects are only created if the event is used, or if it updates the cache
+		if function or event.cache or waiting:
+			# get the corresponding 'Event' class, and create a new instance of it.
+			output = event.function(self,data["d"])
+		# once the cache is updated, the permissions computed with the old roles, channels or members are cleared
+		self.permissions_cache.update(data)
+		if waiting:
+			self.resolve_waiters(event.name, output)
+		# it the event is defined by the user, then run it in a separate thread
+		if function:
+			thread = Thread(target=function,args=(output,))
+			thread.start()
+
+	def stream(self, types=None, maxsize=10000, overflow="drop_oldest"):
+
+		"""
+		Return an :class:`EventStream`, async iterator of the raw events of the gateway
+
+		types:
+			The event types to receive ('MESSAGE_CREATE', ...), None for all the events
+		maxsize:
+			The max number of events waiting to be read
+		overflow:
+			"drop_oldest" or "drop_newest", the event dropped when the buffer is full
+		"""
+
+		stream = EventStream(self, types, maxsize, overflow)
+		self.streams.add(stream)
+		return stream
+
+	def forward(self, sinks, types=("MESSAGE_CREATE",), batch_size=100, batch_time=1.0, maxsize=10000, overflow="drop_oldest"):
+
+		"""
+		Forward the raw events to sinks (see :mod:`piscord.Sinks`), by batches, and return the :class:`EventForwarder`
+
+			bot.forward([FileSink("messages.jsonl"), RedisSink("messages")])
+
+		The events are not created and no thread is started for them.
+		While the sinks are writing, up to 'maxsize' events are kept. The gateway is never blocked by the sinks :
+		when the buffer is full, events are dropped (see 'overflow') and counted in EventForwarder.dropped
+
+		types:
+			The event types to forward, None for all the events
+		batch_size:
+			The max number of events in a batch
+		batch_time:
+			The max time (in seconds) an event waits for its batch to be complete
+		overflow:
+			"drop_oldest" or "drop_newest", the event dropped when the buffer is full
+		"""
+
+		if not isinstance(sinks, (list, tuple)):
+			sinks = [sinks]
+		forwarder = EventForwarder(self.stream(types, maxsize, overflow), sinks, batch_size, batch_time)
+		self.forwarders.append(forwarder)
+		loop = getattr(self, "loop", None)
+		if loop is not None and loop.is_running():
+			forwarder.start(loop)
+		return forwarder
+
+	async def wait_for(self, event, check=None, timeout=None):
+
+		"""
+		Wait for the next event, and return it
+
+		event:
+			The name of the event, as in Bot.event, i.e 'on_message', 'reaction_add', ...
+		check:
+			Function called with the event, the event is returned only if it returns True
+		timeout:
+			The max time to wait in seconds, asyncio.TimeoutError is raised after. None to wait without limit
+
+			reaction = await bot.wait_for("reaction_add", lambda reaction: reaction.user_id == user_id, timeout=60)
+
+		It can be awaited in an async command, or from a sync event with bot.run_coroutine(bot.wait_for(...))
+		"""
+
+		future = asyncio.get_running_loop().create_future()
+		with self.waiters_lock:
+			self.waiters.setdefault(event, {})[future] = check
+		try:
+			return await asyncio.wait_for(future, timeout)
+		finally:
+			with self.waiters_lock:
+				waiters = self.waiters.get(event)
+				if waiters is not None:
+					waiters.pop(future, None)
+					if not waiters:
+						del self.waiters[event]
+
+	def resolve_waiters(self, name, output):
+
+		"""
+		Give the event to the coroutines waiting for it (see Bot.wait_for)
+		"""
+
+		with self.waiters_lock:
+			waiters = list(self.waiters.get(name, {}).items())
+		for future, check in waiters:
+			if future.done():
+				continue
+			try:
+				if check is not None and not check(output):
+					continue
+			except Exception as error:
+				self.__complete(future, error=error)
+				continue
+			with self.waiters_lock:
+				self.waiters.get(name, {}).pop(future, None)
+			self.__complete(future, output)
+
+	@staticmethod
+	def __complete(future, result=None, error=None):
+		def complete():
+			if future.done():
+				return
+			if error is not None:
+				future.set_exception(error)
+			else:
+				future.set_result(result)
+		# the future can belong to another event loop than the one of the gateway
+		future.get_loop().call_soon_threadsafe(complete)
 
 	def set_presence(self, presence, type=0, url=None):
 		self.presence["d"]["game"] = {
@@ -0,0 +1,294 @@
+import aiohttp
+import asyncio
+import json
+import random
+import threading
+import time
+
+from .Errors import http_error, ServerError, ConnexionError
+from .API_Elements2.file import File
+
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+def split_route(method, path):
+	"""
+	Return the route of a request, where every id is replaced by '{id}',
+	and the values of its major parameters (ids of channel, guild or webhook, and webhook token).
+	Discord rate limits requests by route and by major parameters.
+	"""
+	parts = path.split("?", 1)[0].strip("/").split("/")
+	major = []
+	for i in range(len(parts)):
+		if i and parts[i-1] in MAJOR_PARAMETERS:
+			major.append(parts[i])
+		if i > 1 and parts[i-2] == "webhooks":
+			major.append(parts[i])
+			parts[i] = "{token}"
+		elif parts[i].isdigit():
+			parts[i] = "{id}"
+	return f"{method} /{'/'.join(parts)}", tuple(major)
+
+
+class Bucket:
+
+	"""
+	State of a rate limit bucket, updated with the X-RateLimit headers of the responses
+
+	limit:
+		Number of requests allowed per window (None while unknown)
+	remaining:
+		Number of requests that can still be sent before the reset
+	reset_at:
+		Time (see time.monotonic) when the bucket is reset
+	window:
+		Duration of a window, in seconds
+	pending:
+		If the limits of the bucket are not known yet, and a first request is running
+	"""
+
+	def __init__(self):
+		self.limit = None
+		self.remaining = 1
+		self.reset_at = 0.0
+		self.window = 0.0
+		self.pending = False
+
+
+class RateLimiter:
+
+	"""
+	Keep the rate limit buckets of the bot, to wait before sending a request instead of being limited by discord.
+
+	The state is protected by a thread lock, and the waits are asyncio sleeps,
+	so it can be shared by every event loop of the bot (the gateway one, and the ones created by Bot.api).
+
+	global_limit:
+		The max number of requests per second, for all the routes (None for no limit)
+	"""
+
+	poll_interval = 0.05
+
+	def __init__(self, global_limit=50):
+		self.routes = {}
+		self.buckets = {}
+		self.global_reset = 0.0
+		self.global_limit = global_limit
+		self.global_count = 0
+		self.global_window = 0.0
+		self._lock = threading.Lock()
+
+	def get_bucket(self, method, path):
+		route, major = split_route(method, path)
+		key = (self.routes.get(route, route), major)
+		bucket = self.buckets.get(key)
+		if bucket is None:
+			bucket = self.buckets.setdefault(key, Bucket())
+		return bucket
+
+	async def acquire(self, method, path):
+
+		"""
+		Wait until a request can be sent on the route
+
+		Return the :class:`Bucket` of the route, to update it with the response
+		"""
+
+		bucket = self.get_bucket(method, path)
+		while True:
+			delay = self._reserve(bucket)
+			if delay is None:
+				return bucket
+			await asyncio.sleep(delay)
+
+	def _reserve(self, bucket):
+		with self._lock:
+			now = time.monotonic()
+			if self.global_reset > now:
+				return self.global_reset - now
+			if self.global_limit is not None:
+				if self.global_window <= now:
+					self.global_window = now + 1
+					self.global_count = 0
+				if self.global_count >= self.global_limit:
+					return self.global_window - now
+			if bucket.pending:
+				return self.poll_interval
+			if bucket.limit is None:
+				# First request of the bucket : the others wait for its headers
+				bucket.pending = True
+			else:
+				if bucket.reset_at <= now:
+					bucket.remaining = bucket.limit
+					bucket.reset_at = now + bucket.window
+				if bucket.remaining <= 0:
+					return bucket.reset_at - now
+				bucket.remaining -= 1
+			self.global_count += 1
+			return None
+
+	def update(self, bucket, method, path, headers):
+
+		"""
+		Update the bucket with the headers of the response
+		"""
+
+		with self._lock:
+			bucket.pending = False
+			if "X-RateLimit-Limit" not in headers:
+				if bucket.limit is None:
+					bucket.limit = float("inf")
+					bucket.remaining = bucket.limit
+				return
+			now = time.monotonic()
+			bucket.limit = int(headers["X-RateLimit-Limit"])
+			bucket.remaining = int(headers.get("X-RateLimit-Remaining", 0))
+			bucket.window = float(headers.get("X-RateLimit-Reset-After", 1))
+			bucket.reset_at = now + bucket.window
+
+			name = headers.get("X-RateLimit-Bucket")
+			if name:
+				route, major = split_route(method, path)
+				if self.routes.get(route) != name:
+					self.routes[route] = name
+					self.buckets.setdefault((name, major), bucket)
+
+	def rate_limited(self, bucket, retry_after, is_global=False):
+
+		"""
+		Register a 429 response : no request is sent in the bucket (or at all, if the limit is global) before retry_after seconds
+		"""
+
+		with self._lock:
+			reset_at = time.monotonic() + retry_after
+			if is_global:
+				self.global_reset = reset_at
+			bucket.pending = False
+			bucket.remaining = 0
+			bucket.reset_at = max(bucket.reset_at, reset_at)
+			if bucket.limit is None:
+				bucket.limit = 1
+
+	def release(self, bucket):
+
+		"""
+		Release the bucket once the request is done, even if it failed without response
+		"""
+
+		with self._lock:
+			bucket.pending = False
+
+
+class RetryPolicy:
+
+	"""
+	When and after how long a failed request is sent again
+
+	The server errors (5xx) and the connection errors are retried with an exponential backoff,
+	only for the idempotent methods by default : a POST may have been done by discord before the error.
+	A request which could not be sent (no connection to the api) is retried whatever its method.
+	The 429 responses are always waited for, unless discord asks to wait more than max_retry_after.
+
+	retries:
+		The max number of retries of a request
+	backoff:
+		The wait before the first retry, in seconds, doubled at each retry
+	max_backoff:
+		The max wait between two tries
+	methods:
+		The methods which can be retried
+	max_retry_after:
+		The max wait of a 429 response : a longer wait raises :class:`RateLimited`
+	"""
+
+	IDEMPOTENT = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+	def __init__(self, retries=3, backoff=0.5, max_backoff=10, methods=IDEMPOTENT, max_retry_after=60):
+		self.retries = retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.methods = set(methods)
+		self.max_retry_after = max_retry_after
+
+	def should_retry(self, method, attempt, sent=True):
+
+		"""
+		Return True if a request can be sent again after its 'attempt'-th failure
+
+		sent:
+			False if the request failed before being sent, so it was not done by discord
+		"""
+
+		return attempt < self.retries and (method in self.methods or not sent)
+
+	def delay(self, attempt):
+		# with jitter, so the requests failed together are not retried together
+		return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1)
+
+
+async def response_json(response):
+
+	"""
+	Return the json of a response, None if it has no content or is not json
+	"""
+
+	text = await response.text()
+	if not text:
+		return
+	try:
+		return json.loads(text)
+	except ValueError:
+		return
+
+
+async def send_request(ratelimiter, retry_policy, session, url, path, method="GET", headers=None, files=None, **kwargs):
+
+	"""
+	Send a request to the api and return the json of the response (None if there is no content),
+	used by Bot.api_call and WebhookClient.request
+
+	The request waits for its rate limit bucket, and is sent again after a 429 response
+	or after the errors retried by the retry policy.
+	Raise a :class:`HTTPException` if the request failed, a :class:`ConnexionError` if the api can't be reached
+
+	url:
+		The url of the api, before the path
+	headers:
+		The headers of the request, in addition to the ones of the session
+	"""
+
+	route = f"{method} {path}"
+	if files:
+		# The form can be sent once : it is created again for each try
+		files = [File.convert(file) for file in files]
+		payload = kwargs.pop("json", None)
+
+	attempt = 0
+	while True:
+		bucket = await ratelimiter.acquire(method, path)
+		sent = True
+		try:
+			# in the try : the bucket is released if a file can't be read
+			if files:
+				kwargs["data"] = File.form(files, payload)
+			async with session.request(method, url+path, headers=headers, **kwargs) as response:
+				if response.status == 429:
+					retry_after = float(response.headers.get("Retry-After", 1))
+					if retry_after > retry_policy.max_retry_after:
+						raise http_error(429, route, await response_json(response), retry_after)
+					ratelimiter.rate_limited(bucket, retry_after, "X-RateLimit-Global" in response.headers)
+					continue
+				ratelimiter.update(bucket, method, path, response.headers)
+				data = await response_json(response)
+				if 200 <= response.status < 300:
+					return data
+				error = http_error(response.status, route, data)
+		except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+			error = ConnexionError(f"{route} - {e!r}")
+			# no connection could be opened : the request was not sent
+			sent = not isinstance(e, aiohttp.ClientConnectorError)
+		finally:
+			ratelimiter.release(bucket)
+		if not isinstance(error, (ServerError, ConnexionError)) or not retry_policy.should_retry(method, attempt, sent):
+			raise error
+		await asyncio.sleep(retry_policy.delay(attempt))
+		attempt += 1
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import traceback
+
+"""
+Sinks : where the events forwarded by an :class:`EventForwarder` are written
+
+A sink is any object with the coroutines write(lines) and close() :
+'lines' is the batch of events, a list of bytes (one serialized event per line, ended by a newline)
+write should only return once the batch is accepted by the destination : a slow destination slows down
+the forwarder, whose events are then buffered (see :class:`EventStream`), instead of being kept in memory without limit.
+"""
+
+class FileSink:
+
+	"""
+	Append the events to a file, in JSON lines
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.file = open(path, "ab")
+
+	async def write(self, lines):
+		data = b"".join(lines)
+		await asyncio.get_running_loop().run_in_executor(None, self.__write, data)
+
+	def __write(self, data):
+		self.file.write(data)
+		self.file.flush()
+
+	async def close(self):
+		self.file.close()
+
+
+class UnixSocketSink:
+
+	"""
+	Send the events in JSON lines to a local Unix socket, connected on the first batch
+	"""
+
+	def __init__(self, path):
+		self.path = path
+		self.writer = None
+
+	async def write(self, lines):
+		if self.writer is None:
+			reader, self.writer = await asyncio.open_unix_connection(self.path)
+		self.writer.writelines(lines)
+		await self.writer.drain()
+
+	async def close(self):
+		if self.writer is not None:
+			self.writer.close()
+			await self.writer.wait_closed()
+			self.writer = None
+
+
+class QueueSink:
+
+	"""
+	Put the batches in an asyncio.Queue, to use the events in the same process
+
+	With a maxsize, the forwarder waits while the queue is full
+	"""
+
+	def __init__(self, queue=None, maxsize=100):
+		self.queue = queue if queue is not None else asyncio.Queue(maxsize)
+
+	async def write(self, lines):
+		await self.queue.put(lines)
+
+	async def close(self):
+		pass
+
+
+class RedisSink:
+
+	"""
+	Push the events to a Redis list (RPUSH key event...), with a batch in a single command
+
+	Only the RESP protocol is used : any server compatible with Redis works
+
+	host, port:
+		The address of the server
+	key:
+		The name of the list
+	"""
+
+	def __init__(self, key, host="localhost", port=6379):
+		self.key = key.encode()
+		self.host = host
+		self.port = port
+		self.reader = None
+		self.writer = None
+
+	@staticmethod
+	def command(*arguments):
+
+		"""
+		Encode a command in RESP : an array of bulk strings
+		"""
+
+		parts = [b"*%d\r\n" % len(arguments)]
+		for argument in arguments:
+			parts.append(b"$%d\r\n" % len(argument))
+			parts.append(argument)
+			parts.append(b"\r\n")
+		return parts
+
+	async def write(self, lines):
+		if self.writer is None:
+			self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+		self.writer.writelines(self.command(b"RPUSH", self.key, *(line.rstrip(b"\n") for line in lines)))
+		await self.writer.drain()
+		reply = await self.reader.readline()
+		if reply.startswith(b"-"):
+			raise ConnectionError(f"Redis error : {reply[1:].decode().strip()}")
+
+	async def close(self):
+		if self.writer is not None:
+			self.writer.close()
+			await self.writer.wait_closed()
+			self.writer = None
+
+
+class EventForwarder:
+
+	"""
+	Forward the raw events of the gateway to sinks, by batches, created by Bot.forward
+
+	Each event is serialized once in JSON, and the same bytes are given to every sink.
+	A batch is written when it has 'batch_size' events, or 'batch_time' seconds after its first event.
+
+	sinks:
+		List of sinks (:class:`FileSink`, :class:`UnixSocketSink`, :class:`QueueSink`, :class:`RedisSink`...)
+	stream:
+		The :class:`EventStream` of the events, which buffers them while the sinks are writing.
+		The gateway is not slowed down by slow sinks : when the buffer is full, events are dropped
+	sent:
+		The number of events written by every sink
+	failed:
+		The number of events that at least one sink failed to write
+	dropped:
+		The number of events dropped because the buffer of the stream was full
+	"""
+
+	def __init__(self, stream, sinks, batch_size=100, batch_time=1.0):
+		self.stream = stream
+		self.sinks = list(sinks)
+		self.batch_size = batch_size
+		self.batch_time = batch_time
+		self.sent = 0
+		self.failed = 0
+		self.task = None
+
+	@property
+	def dropped(self):
+		return self.stream.dropped
+
+	@staticmethod
+	def serialize(event):
+		return json.dumps(event, separators=(",", ":")).encode() + b"\n"
+
+	async def batch(self):
+
+		"""
+		Wait for the next batch of serialized events, None when the stream is closed
+		"""
+
+		try:
+			event = await self.stream.__anext__()
+		except StopAsyncIteration:
+			return
+		lines = [self.serialize(event)]
+		loop = asyncio.get_running_loop()
+		deadline = loop.time() + self.batch_time
+		buffer = self.stream.buffer
+		while len(lines) < self.batch_size:
+			if buffer:
+				lines.append(self.serialize(buffer.popleft()))
+				continue
+			timeout = deadline - loop.time()
+			if timeout <= 0:
+				break
+			try:
+				event = await asyncio.wait_for(self.stream.__anext__(), timeout)
+			except (asyncio.TimeoutError, StopAsyncIteration):
+				break
+			lines.append(self.serialize(event))
+		return lines
+
+	async def run(self):
+		try:
+			while True:
+				lines = await self.batch()
+				if lines is None:
+					break
+				results = await asyncio.gather(*(sink.write(lines) for sink in self.sinks), return_exceptions=True)
+				errors = [result for result in results if isinstance(result, Exception)]
+				for error in errors:
+					traceback.print_exception(type(error), error, error.__traceback__)
+				if errors:
+					self.failed += len(lines)
+				else:
+					self.sent += len(lines)
+		finally:
+			for sink in self.sinks:
+				await sink.close()
+
+	def start(self, loop=None):
+
+		"""
+		Start forwarding in the event loop (by default, the running loop)
+		"""
+
+		if loop is None:
+			self.task = asyncio.ensure_future(self.run())
+		else:
+			self.task = asyncio.run_coroutine_threadsafe(self.run(), loop)
+		return self.task
+
+	def stop(self):
+
+		"""
+		Stop the forwarder, after writing the events already received
+		"""
+
+		self.stream.close()
@@ -0,0 +1,115 @@
+import asyncio
+from collections import deque
+
+class EventStream:
+
+	"""
+	Async iterator of the raw events of the gateway, created by Bot.stream :
+
+		async with bot.stream(types=["MESSAGE_CREATE"]) as stream:
+			async for event in stream:
+				print(event["d"]["content"])
+
+	The events are the dispatch payloads decoded from the gateway ({"op": 0, "t": ..., "s": ..., "d": ...}),
+	given without creating their objects. The same dict is given to every stream and event : it should not be modified.
+
+	The events are buffered until they are read, up to 'maxsize' events :
+	the gateway is never slowed down by a stream, when the buffer is full the events are dropped.
+
+	types:
+		Set of the event types to receive ('MESSAGE_CREATE', 'GUILD_MEMBER_ADD'...), None for all the events
+	maxsize:
+		The max number of events in the buffer
+	overflow:
+		When the buffer is full, "drop_oldest" (default) removes the oldest event, "drop_newest" ignores the new event
+	dropped:
+		The number of events dropped
+	"""
+
+	def __init__(self, bot, types=None, maxsize=10000, overflow="drop_oldest"):
+		if overflow not in ("drop_oldest", "drop_newest"):
+			raise ValueError("overflow should be 'drop_oldest' or 'drop_newest'")
+		self.__bot = bot
+		self.types = set(types) if types is not None else None
+		self.maxsize = maxsize
+		self.overflow = overflow
+		self.dropped = 0
+		self.closed = False
+		self.buffer = deque()
+		self.waiter = None
+		try:
+			self.loop = asyncio.get_running_loop()
+		except RuntimeError:
+			self.loop = None
+
+	def __repr__(self):
+		return f"EventStream(types={self.types}, buffered={len(self.buffer)}, dropped={self.dropped})"
+
+	def feed(self, data):
+
+		"""
+		Add an event to the stream, can be called from any thread
+		"""
+
+		if self.closed or (self.types is not None and data["t"] not in self.types):
+			return
+		if self.loop is None:
+			self.put(data)
+			return
+		try:
+			running = asyncio.get_running_loop()
+		except RuntimeError:
+			running = None
+		if running is self.loop:
+			self.put(data)
+		else:
+			self.loop.call_soon_threadsafe(self.put, data)
+
+	def put(self, data):
+		if len(self.buffer) >= self.maxsize:
+			self.dropped += 1
+			if self.overflow == "drop_newest":
+				return
+			self.buffer.popleft()
+		self.buffer.append(data)
+		self.wake()
+
+	def wake(self):
+		if self.waiter is not None and not self.waiter.done():
+			self.waiter.set_result(None)
+
+	def close(self):
+
+		"""
+		Stop the stream : the events in the buffer can still be read, then the iteration ends
+		"""
+
+		self.closed = True
+		self.__bot.streams.discard(self)
+		if self.loop is not None:
+			try:
+				self.loop.call_soon_threadsafe(self.wake)
+			except RuntimeError:
+				pass
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		if self.loop is None:
+			self.loop = asyncio.get_running_loop()
+		while not self.buffer:
+			if self.closed:
+				raise StopAsyncIteration
+			self.waiter = self.loop.create_future()
+			try:
+				await self.waiter
+			finally:
+				self.waiter = None
+		return self.buffer.popleft()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *args):
+		self.close()
@@ -1,76 +1,231 @@
 import asyncio
-import socket
-import subprocess
+import os
+import struct
+import traceback
 from random import randint
 
+try:
+	import nacl.secret
+	import nacl.bindings
+except ImportError:
+	nacl = None
+
 from .Gateway import *
+from .Audio import FRAME_DURATION, FRAME_SAMPLES, Decoder, opus_frames
+
+class VoiceManager:
+
+	"""
+	The voice connections of the bot, one by guild (bot.voice_manager)
+
+	The voice states are sent with the gateway of the bot (op 4), and the VOICE_STATE_UPDATE
+	and VOICE_SERVER_UPDATE events are given by Bot.__main to the voice of their guild :
+	a voice connection does not open another connection to the main gateway.
+	All the voice gateways and UDP sockets run in the event loop of the bot.
+	"""
+
+	def __init__(self, bot):
+		self.voices = bot.voices
+		self.__bot = bot
+
+	async def connect(self, guild_id, channel_id, mute=False, deaf=False, timeout=10):
+
+		"""
+		Join a voice channel (or move to another channel of the guild), and return the :class:`Voice` once ready to play
+		"""
+
+		voice = self.voices.get(guild_id)
+		if voice is None:
+			voice = Voice({"guild_id": guild_id, "channel_id": channel_id, "mute": mute, "deaf": deaf}, self.__bot)
+			self.voices[guild_id] = voice
+		else:
+			voice.channel_id = channel_id
+		await self.__bot.gateway.send(self.voice_state(guild_id, channel_id, mute, deaf))
+		try:
+			await asyncio.wait_for(voice.ready.wait(), timeout)
+		except asyncio.TimeoutError:
+			await self.disconnect(guild_id)
+			raise
+		return voice
+
+	async def disconnect(self, guild_id):
+
+		"""
+		Leave the voice channel of the guild
+		"""
+
+		voice = self.voices.pop(guild_id, None)
+		if voice:
+			voice.stop()
+		await self.__bot.gateway.send(self.voice_state(guild_id, None))
+
+	def join(self, guild_id, channel_id, mute=False, deaf=False, timeout=10):
+
+		"""
+		Same as VoiceManager.connect, called from another thread than the event loop of the bot (in an event)
+		"""
+
+		return asyncio.run_coroutine_threadsafe(self.connect(guild_id, channel_id, mute, deaf, timeout), self.__bot.loop).result()
+
+	def leave(self, guild_id):
+		return asyncio.run_coroutine_threadsafe(self.disconnect(guild_id), self.__bot.loop).result()
+
+	@staticmethod
+	def voice_state(guild_id, channel_id, mute=False, deaf=False):
+		return {
+			"op": 4,
+			"d": {
+				"guild_id": guild_id,
+				"channel_id": channel_id,
+				"self_mute": mute,
+				"self_deaf": deaf
+		}}
+
+	def update(self, data):
+
+		"""
+		Give a VOICE_STATE_UPDATE or VOICE_SERVER_UPDATE event to the voice of its guild
+		"""
+
+		event = data["d"]
+		voice = self.voices.get(event.get("guild_id"))
+		if voice is None:
+			return
+		if data["t"] == "VOICE_STATE_UPDATE":
+			if event["user_id"] != self.__bot.user.id:
+				return
+			if event["channel_id"] is None:
+				# disconnected from the channel (by a moderator, or by VoiceManager.disconnect)
+				self.voices.pop(voice.guild_id, None)
+				voice.stop()
+				return
+			voice.channel_id = event["channel_id"]
+			voice.session_id = event["session_id"]
+		else:
+			voice.token = event["token"]
+			# the endpoint is None while discord allocates a new voice server
+			voice.endpoint = event["endpoint"].rsplit(":", 1)[0] if event.get("endpoint") else None
+		voice.update()
+
 
 class Voice:
 
+	"""
+	A voice connection of the bot, in a guild (see VoiceManager.connect and VoiceChannel.join)
+
+	ready:
+		asyncio.Event, set when the voice can play audio
+	"""
+
 	def __init__(self, voice, bot):
 		self.guild_id = voice["guild_id"]
 		self.channel_id = voice["channel_id"]
 		self.mute = voice.get("mute",None)
 		self.deaf = voice.get("deaf",None)
-		self.state = 0
-		self.gateway = None
-		self.client = Voice_Client(self.guild_id,bot.user.id)
+		self.session_id = None
+		self.token = None
+		self.endpoint = None
+		self.ready = asyncio.Event()
+		self.receivers = set()
+		self.client = None
+		self.task = None
 		self.__bot = bot
 
-	async def run(self):
-		self.loop = asyncio.get_event_loop()
-		response = await self.__bot.api_call("/gateway")
-		gateway = Gateway(f"{response['url']}?v=7&encoding=json", self.__bot.token)
-		self.gateway = gateway
-		async for data in gateway.connect():
-			if data["op"] == 0:
-				if data["t"] == "READY":
-					await gateway.send({
-						"op":4,
-						"d":{
-							"guild_id": self.guild_id,
-							"channel_id": self.channel_id,
-							"mute": self.mute,
-							"deaf": self.deaf
-					}})
-				
-				if data["t"] == "VOICE_SERVER_UPDATE":
-					if data["d"]["guild_id"] == self.guild_id:
-						self.client.token = data["d"]["token"]
-						self.client.endpoint = data["d"]["endpoint"][:-3]
-				elif data["t"] == "VOICE_STATE_UPDATE":
-					if data["d"]["user_id"] == self.__bot.user.id and data["d"]["guild_id"] == self.guild_id:
-						self.client.session_id = data["d"]["session_id"]
-				if self.client.session_id and self.client.token and not self.state:
-					self.state = 1
-					asyncio.create_task(self.client.run())
-				
+	@property
+	def loop(self):
+		return self.__bot.loop
+
+	def update(self):
+
+		"""
+		Connect to the voice server once the session and the server are known,
+		or move to the new server when it changes
+		"""
+
+		if not (self.session_id and self.token and self.endpoint):
+			return
+		client = self.client
+		if client and client.running and (client.session_id, client.token, client.endpoint) == (self.session_id, self.token, self.endpoint):
+			return
+		if client and client.running:
+			client.move(self.session_id, self.token, self.endpoint)
+			return
+		if client:
+			client.stop()
+		self.ready.clear()
+		self.client = Voice_Client(self.guild_id, self.__bot.user.id, self.ready, self.receivers)
+		self.client.session_id = self.session_id
+		self.client.token = self.token
+		self.client.endpoint = self.endpoint
+		self.task = asyncio.ensure_future(self.client.run())
+
 	def stop(self):
-		if self.client.gateway:
+		if self.client:
 			self.client.stop()
-		if self.gateway:
-			self.gateway.stop()
+			self.client = None
+		self.ready.clear()
+		for receiver in list(self.receivers):
+			receiver.close()
 
-	def play(self, name):
-		print("bip1")
-		payload = {
-			"op":5,
-			"d": {
-				"speaking": 1,
-				"delay": 0,
-				"ssrc": 1
-		}}
-		asyncio.run(self.client.gateway.send(payload))
-		ip = socket.gethostbyname(self.client.endpoint)
-		self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-		sending = AudioStream()
-		print("bip2")
-		self.socket.sendto(sending.encode_packet(name), (ip, self.client.port))
-		print("bip3")
+	def receive(self, maxsize=500):
+
+		"""
+		Return a :class:`VoiceReceiver`, async iterator of the audio received in the channel : (user_id, pcm) for each frame
+
+			async with voice.receive() as receiver:
+				async for user_id, pcm in receiver:
+					...
+
+		The audio is decoded by libopus. The frames of a user are given in order, every 20ms,
+		with a small delay to reorder the late packets (see :class:`JitterBuffer`)
+
+		maxsize:
+			The max number of frames waiting to be read, the oldest are dropped after
+		"""
+
+		receiver = VoiceReceiver(self.receivers, maxsize)
+		self.receivers.add(receiver)
+		return receiver
+
+	def play(self, source):
+
+		"""
+		Play an audio in the voice channel
+
+		source:
+			The path (or url) of an audio file, read with ffmpeg, an :class:`AudioSource` (see :mod:`piscord.Audio`),
+			or an async iterator of Opus frames of 20ms
+
+		Return a concurrent.futures.Future, done at the end of the audio
+		"""
+
+		return asyncio.run_coroutine_threadsafe(self.play_async(source), self.loop)
+
+	async def play_async(self, source):
+
+		"""
+		Same as Voice.play, to be awaited in the event loop of the bot
+		"""
+
+		await self.ready.wait()
+		await self.client.play(source)
 
 class Voice_Client:
 
-	def __init__(self, guild_id, user_id):
+	"""
+	The connection to the voice server : the voice gateway, and the UDP socket sending the audio
+
+	ssrc:
+		The id of the audio stream of the bot
+	ip, port:
+		The address of the UDP voice server
+	mode:
+		The encryption mode used
+	error:
+		The exception which closed the voice gateway, or None
+	"""
+
+	def __init__(self, guild_id, user_id, ready=None, receivers=None):
 		self.guild_id = guild_id
 		self.user_id = user_id
 		self.session_id = None
@@ -79,40 +234,409 @@ class Voice_Client:
 		self.gateway = None
 		self.secret_key = None
 		self.mode = None
-	
+		self.ssrc = None
+		self.transport = None
+		self.protocol = None
+		self.stream = None
+		self.ready = ready if ready is not None else asyncio.Event()
+		self.lock = asyncio.Lock()
+		self.receivers = receivers if receivers is not None else set()
+		self.ssrc_users = {}
+		self.incoming = {}
+		self.running = False
+		self.moved = False
+		self.error = None
+
 	async def run(self):
-		gateway = Gateway(f"wss://{self.endpoint}/?v=4", "", auth_op = 8, events_code = -1, heartbeat_code = 3)
-		self.gateway = gateway
-		payload = {
-			"op": 0,
+
+		"""
+		Connect to the voice gateway, and to the new voice server when it changes (see Voice_Client.move)
+		"""
+
+		self.running = True
+		self.error = None
+		try:
+			while self.running:
+				self.moved = False
+				gateway = VoiceGateway(f"wss://{self.endpoint}/?v=4", self.guild_id, self.user_id, self.session_id, self.token)
+				self.gateway = gateway
+				async for data in gateway.connect():
+
+					if data["op"] == 2:
+						self.ssrc = data["d"]["ssrc"]
+						self.ip = data["d"]["ip"]
+						self.port = data["d"]["port"]
+						self.mode = select_mode(data["d"]["modes"])
+						if self.transport:
+							self.transport.close()
+						address, port = await self.connect_udp()
+						payload = {
+							"op": 1,
+							"d": {
+								"protocol": "udp",
+								"data": {
+									"address": address,
+									"port": port,
+									"mode": self.mode
+						}}}
+						await gateway.send(payload)
+
+					if data["op"] == 4:
+						self.mode = data["d"]["mode"]
+						self.secret_key = bytes(data["d"]["secret_key"])
+						self.stream = AudioStream(self.ssrc, Encryption(self.mode, self.secret_key))
+						self.ready.set()
+
+					if data["op"] == 5:
+						# a user speaks : the ssrc of its audio
+						self.ssrc_users[data["d"]["ssrc"]] = data["d"]["user_id"]
+
+					if data["op"] == 9 and self.lock.locked():
+						# resumed while playing
+						await self.speaking()
+
+				if not self.moved:
+					break
+		except Exception as error:
+			# the voice gateway is closed (invalid token, lost connection...) : the client can't be used anymore
+			self.error = error
+			traceback.print_exception(type(error), error, error.__traceback__)
+		finally:
+			self.running = False
+			self.ready.clear()
+
+	def move(self, session_id, token, endpoint):
+
+		"""
+		Connect to another voice server : the audio being played pauses, and continues on the new server
+		"""
+
+		self.session_id = session_id
+		self.token = token
+		self.endpoint = endpoint
+		self.moved = True
+		self.ready.clear()
+		if self.gateway:
+			self.gateway.stop()
+
+	@property
+	def latency(self):
+		return self.gateway.latency if self.gateway else None
+
+	async def connect_udp(self):
+
+		"""
+		Open the UDP socket to the voice server, and return the external address and port of the bot (IP discovery)
+		"""
+
+		loop = asyncio.get_running_loop()
+		self.transport, self.protocol = await loop.create_datagram_endpoint(
+			lambda: VoiceProtocol(self), remote_addr=(self.ip, self.port))
+		return await self.protocol.discover(self.ssrc)
+
+	async def speaking(self, speaking=True):
+		await self.gateway.send({
+			"op": 5,
 			"d": {
-				"server_id": self.guild_id,
-				"user_id": self.user_id,
-				"session_id": self.session_id,
-				"token": self.token
-		}}
-		async for data in gateway.connect(payload):
-
-			if data["op"] == 2:
-				self.ip = data["d"]["ip"]
-				self.port = data["d"]["port"]
-				payload = {
-					"op": 1,
-					"d": {
-						"protocol": "udp",
-						"data": {
-							"address": self.ip,
-							"port": self.port,
-							"mode": "xsalsa20_poly1305_lite"
-				}}}
-				await gateway.send(payload)
-
-			if data["op"] == 4:
-				self.mode = data["d"]["mode"]
-				self.secret_key = data["d"]["secret_key"]
+				"speaking": 1 if speaking else 0,
+				"delay": 0,
+				"ssrc": self.ssrc
+		}})
+
+	async def play(self, source):
+
+		"""
+		Send the Opus frames of an audio, one every 20ms
+
+		The frames are sent at fixed times from the start of the audio, so the delays of the event loop
+		do not add up. If the audio is late of more than 200ms (the source was too slow), it restarts from now
+		instead of sending the late frames at once.
+		While the client moves to another voice server, the audio is paused.
+		"""
+
+		source = opus_frames(source)
+		await self.ready.wait()
+		async with self.lock:
+			loop = asyncio.get_running_loop()
+			await self.speaking()
+			try:
+				start = loop.time()
+				frames = 0
+				async for frame in source:
+					if not self.ready.is_set():
+						await self.ready.wait()
+						await self.speaking()
+						start = loop.time()
+						frames = 0
+					self.transport.sendto(self.stream.encode_packet(frame))
+					frames += 1
+					delay = start + frames * FRAME_DURATION - loop.time()
+					if delay < -0.2:
+						# the time of the audio continues during the gap
+						self.stream.timestamp = (self.stream.timestamp + int(-delay / FRAME_DURATION) * FRAME_SAMPLES) % 2**32
+						start = loop.time()
+						frames = 0
+					elif delay > 0:
+						await asyncio.sleep(delay)
+				# frames of silence, so the end of the audio is not interpolated
+				for i in range(5):
+					self.transport.sendto(self.stream.encode_packet(SILENCE))
+					await asyncio.sleep(FRAME_DURATION)
+			finally:
+				if self.ready.is_set():
+					await self.speaking(False)
+
+	def receive_packet(self, packet):
+
+		"""
+		Decrypt and decode an audio packet received, and give its frames to the receivers
+		"""
+
+		if not self.receivers or self.stream is None or len(packet) < 12:
+			return
+		if 200 <= packet[1] <= 204:
+			# RTCP packet, not audio
+			return
+		sequence, timestamp, ssrc = struct.unpack_from(">HII", packet, 2)
+		encryption = self.stream.encryption
+		try:
+			audio = encryption.decrypt(packet) if encryption else packet[12:]
+		except Exception:
+			return
+		if ssrc not in self.incoming:
+			self.incoming[ssrc] = (JitterBuffer(), Decoder())
+		buffer, decoder = self.incoming[ssrc]
+		buffer.push(sequence, audio)
+		user_id = self.ssrc_users.get(ssrc)
+		for frame in buffer.pop():
+			pcm = decoder.decode(frame)
+			for receiver in list(self.receivers):
+				receiver.put((user_id, pcm))
 
 	def stop(self):
-		self.gateway.stop()
+		self.running = False
+		if self.transport:
+			self.transport.close()
+		if self.gateway:
+			self.gateway.stop()
+
+
+class VoiceProtocol(asyncio.DatagramProtocol):
+
+	"""
+	The UDP socket of a voice connection
+	"""
+
+	def __init__(self, client):
+		self.client = client
+		self.discovery = None
+
+	def discover(self, ssrc):
+
+		"""
+		Send an IP discovery request : the server answers with the address and port of the bot, seen from outside
+		"""
+
+		self.discovery = asyncio.get_running_loop().create_future()
+		packet = bytearray(74)
+		struct.pack_into(">HHI", packet, 0, 1, 70, ssrc)
+		self.transport.sendto(packet)
+		return asyncio.wait_for(self.discovery, 10)
+
+	def connection_made(self, transport):
+		self.transport = transport
+
+	def datagram_received(self, data, address):
+		if self.discovery and not self.discovery.done() and len(data) == 74 and data[1] == 2:
+			ip = data[8:72].split(b"\0", 1)[0].decode()
+			port = struct.unpack_from(">H", data, 72)[0]
+			self.discovery.set_result((ip, port))
+		else:
+			self.client.receive_packet(data)
+
+	def error_received(self, error):
+		if self.discovery and not self.discovery.done():
+			self.discovery.set_exception(error)
+
+
+"""
+The encryption modes, by order of preference
+"""
+
+MODES = ("aead_xchacha20_poly1305_rtpsize", "xsalsa20_poly1305_lite", "xsalsa20_poly1305_suffix", "xsalsa20_poly1305")
+
+SILENCE = b"\xf8\xff\xfe"
+
+def select_mode(modes):
+	for mode in MODES:
+		if mode in modes:
+			return mode
+	raise ConnexionError(f"No supported encryption mode in {modes}")
+
+
+class Encryption:
+
+	"""
+	Encrypt the audio with the key given by the voice server, according to the mode
+
+	PyNaCl is needed for the voices : pip install pynacl
+	"""
+
+	def __init__(self, mode, secret_key):
+		if nacl is None:
+			raise ImportError("You should install PyNaCl to use voices : pip install pynacl")
+		self.mode = mode
+		self.secret_key = secret_key
+		self.box = nacl.secret.SecretBox(secret_key)
+		self.nonce = 0
+
+	def encrypt(self, header, data):
+
+		"""
+		Return the encrypted audio and the suffix written after it in the packet (the nonce, or b"")
+
+		header:
+			The RTP header of the packet
+		"""
+
+		if self.mode == "aead_xchacha20_poly1305_rtpsize":
+			nonce = self.next_nonce()
+			return nacl.bindings.crypto_aead_xchacha20poly1305_ietf_encrypt(
+				bytes(data), bytes(header), nonce, self.secret_key), nonce[:4]
+		if self.mode == "xsalsa20_poly1305_lite":
+			nonce = self.next_nonce()
+			return self.box.encrypt(bytes(data), nonce).ciphertext, nonce[:4]
+		if self.mode == "xsalsa20_poly1305_suffix":
+			nonce = os.urandom(24)
+			return self.box.encrypt(bytes(data), nonce).ciphertext, nonce
+		nonce = bytes(header) + bytes(12)
+		return self.box.encrypt(bytes(data), nonce).ciphertext, b""
+
+	def decrypt(self, packet):
+
+		"""
+		Return the audio of a packet received : decrypted, without the RTP header and its extension
+		"""
+
+		header = 12 + (packet[0] & 0x0F) * 4
+		extension = packet[0] & 0x10
+		if self.mode == "aead_xchacha20_poly1305_rtpsize":
+			if extension:
+				# the header of the extension is not encrypted, only its content
+				header += 4
+			audio = nacl.bindings.crypto_aead_xchacha20poly1305_ietf_decrypt(
+				bytes(packet[header:-4]), bytes(packet[:header]), bytes(packet[-4:]) + bytes(20), self.secret_key)
+			if extension:
+				audio = audio[struct.unpack_from(">H", packet, header - 2)[0] * 4:]
+			return audio
+
+		if self.mode == "xsalsa20_poly1305_lite":
+			audio = self.box.decrypt(bytes(packet[header:-4]), bytes(packet[-4:]) + bytes(20))
+		elif self.mode == "xsalsa20_poly1305_suffix":
+			audio = self.box.decrypt(bytes(packet[header:-24]), bytes(packet[-24:]))
+		else:
+			audio = self.box.decrypt(bytes(packet[header:]), bytes(packet[:12]) + bytes(12))
+		if extension:
+			audio = audio[4 + struct.unpack_from(">H", audio, 2)[0] * 4:]
+		return audio
+
+	def next_nonce(self):
+		self.nonce = (self.nonce + 1) % 2**32
+		return struct.pack(">I", self.nonce) + bytes(20)
+
+class JitterBuffer:
+
+	"""
+	Put the audio packets of a user back in order
+
+	The packets are given by order of sequence : a packet arriving before the previous ones is kept until they arrive.
+	If a packet is still missing when 'delay' packets are waiting after it, it is considered lost
+	(None is given instead, for the decoder to conceal it), and at most 'max_lost' are given for a gap.
+
+	delay:
+		The number of packets waiting for a missing packet
+	"""
+
+	def __init__(self, delay=3, max_lost=5):
+		self.delay = delay
+		self.max_lost = max_lost
+		self.packets = {}
+		self.next = None
+
+	def push(self, sequence, audio):
+		if self.next is None:
+			self.next = sequence
+		elif (sequence - self.next) & 0xFFFF >= 0x8000:
+			# older than the packets already given
+			return
+		self.packets[sequence] = audio
+
+	def pop(self):
+
+		"""
+		Return the list of the frames ready, in order (None for a lost packet)
+		"""
+
+		frames = []
+		while self.packets:
+			if self.next in self.packets:
+				frames.append(self.packets.pop(self.next))
+				self.next = (self.next + 1) & 0xFFFF
+			elif len(self.packets) > self.delay:
+				nearest = min(self.packets, key=lambda sequence: (sequence - self.next) & 0xFFFF)
+				frames.extend([None] * min((nearest - self.next) & 0xFFFF, self.max_lost))
+				self.next = nearest
+			else:
+				break
+		return frames
+
+
+class VoiceReceiver:
+
+	"""
+	Async iterator of the audio received by a voice, created by Voice.receive : (user_id, pcm) for each frame
+
+	user_id is None when the user is not known yet (before their first speaking event)
+
+	dropped:
+		The number of frames dropped because they were not read
+	"""
+
+	def __init__(self, receivers, maxsize=500):
+		self.receivers = receivers
+		self.queue = asyncio.Queue(maxsize)
+		self.dropped = 0
+		self.closed = False
+
+	def put(self, frame):
+		if self.queue.full():
+			self.queue.get_nowait()
+			self.dropped += 1
+		self.queue.put_nowait(frame)
+
+	def close(self):
+		self.receivers.discard(self)
+		if not self.closed:
+			self.closed = True
+			if self.queue.full():
+				self.queue.get_nowait()
+			self.queue.put_nowait(None)
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		frame = await self.queue.get()
+		if frame is None:
+			raise StopAsyncIteration
+		return frame
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *args):
+		self.close()
+
 
 class AudioStream:
 	"""
@@ -121,38 +645,45 @@ class AudioStream:
 	- https://www.rfcreader.com/#rfc3550_line548
 	and more specifically to this section of discord's documentation:
 	- https://discord.com/developers/docs/topics/voice-connections#encrypting-and-sending-voice-voice-packet-structure
+
+	The packets are written in a buffer allocated once : encode_packet returns a memoryview of it,
+	valid until the next call (the socket sends or copies it immediately).
 	"""
 
-	def __init__(self):
+	HEADER = struct.Struct(">BBHII")
+	PACKET_SIZE = 4096
+
+	def __init__(self, ssrc=None, encryption=None):
 		self.sequence = randint(0, 65_535)
-		self.ssrc = randint(0, 65_535)
+		self.ssrc = ssrc if ssrc is not None else randint(0, 65_535)
 		self.timestamp = 0
+		self.encryption = encryption
+		self.buffer = bytearray(self.PACKET_SIZE)
+		self.view = memoryview(self.buffer)
+		self.header = self.view[:12]
 
 	def encode_packet(self, audio):
-		packet = bytearray()
-		packet.append(0x80)
-		packet.append(0x78)
-		self.packet_add(packet, self.sequence, 2)
-		self.packet_add(packet, self.timestamp, 4)
-		self.packet_add(packet, self.ssrc, 4)
 
-		return bytes(packet) + b"r"*1000 #self.encode_voice_data(audio)[:5000]
-
-	def packet_add(self, packet, value, bytes):
-		for i in range(bytes,0,-1):
-			x = 256**(i-1)
-			v = value//x
-			if v > 255:
-				raise ValueError("Too large number")
-			value = value%x
-			packet.append(v)
-
-	def encode_voice_data(self, audio: str):
 		"""
-		Todo: implement Opus audio encryption and increment timestamp accordingly 
+		Return the RTP packet of an Opus frame, and advance the sequence and the timestamp
 		"""
-		try:
-			output = subprocess.Popen(f"ffmpeg -i {audio} -f s16le -ar 48000 -ac 2 -loglevel warning pipe:1",stdout=subprocess.PIPE).stdout
-		except FileNotFoundError as e:
-			raise ProcessLookupError("You should install ffmpeg to use voices")
-		return output.read()
\ No newline at end of file
+
+		self.HEADER.pack_into(self.buffer, 0, 0x80, 0x78, self.sequence, self.timestamp, self.ssrc)
+		self.sequence = (self.sequence + 1) & 0xFFFF
+		self.timestamp = (self.timestamp + FRAME_SAMPLES) & 0xFFFFFFFF
+
+		if self.encryption is None:
+			return self.write(audio)
+		return self.write(*self.encryption.encrypt(self.header, audio))
+
+	def write(self, *parts):
+		size = 12 + sum(len(part) for part in parts)
+		if size > len(self.buffer):
+			self.buffer = self.buffer[:12] + bytearray(size)
+			self.view = memoryview(self.buffer)
+			self.header = self.view[:12]
+		position = 12
+		for part in parts:
+			self.view[position:position + len(part)] = part
+			position += len(part)
+		return self.view[:size]
@@ -0,0 +1,163 @@
+import aiohttp
+
+from .RateLimit import RateLimiter, RetryPolicy, send_request
+from .API_Elements2.embed import Embed
+
+class WebhookClient:
+
+	"""
+	Send messages with webhooks, without a bot token nor a gateway connection
+
+		async with WebhookClient() as client:
+			webhook = client.webhook("https://discord.com/api/webhooks/123/token")
+			await webhook.send("Hello")
+
+	The requests of every webhook share the connections of the client (kept open between the requests),
+	and are rate limited by webhook, with the limits given by discord.
+
+	connections:
+		The max number of connections open at the same time
+	session:
+		An aiohttp.ClientSession to use, by default the client creates its own session
+	retry_policy: :class:`RetryPolicy`
+		When the failed requests are sent again, as for the bot
+	"""
+
+	api_url = "https://discord.com/api"
+
+	def __init__(self, connections=100, session=None, retry_policy=None):
+		self.connections = connections
+		self.retry_policy = retry_policy or RetryPolicy()
+		self.session = session
+		self.own_session = session is None
+		# the global limit of the bots does not apply to the webhooks
+		self.ratelimiter = RateLimiter(global_limit=None)
+
+	def webhook(self, url=None, id=None, token=None):
+
+		"""
+		Return a :class:`PartialWebhook`, from the url of the webhook or from its id and token
+		"""
+
+		if url is not None:
+			parts = url.split("?", 1)[0].rstrip("/").split("/")
+			id, token = parts[-2], parts[-1]
+		return PartialWebhook(self, id, token)
+
+	def get_session(self):
+		if self.session is None or self.session.closed:
+			self.session = aiohttp.ClientSession(
+				connector=aiohttp.TCPConnector(limit=self.connections),
+				headers={"User-Agent": "Piscord Webhook", "X-RateLimit-Precision": "millisecond"})
+		return self.session
+
+	async def request(self, path, method="GET", files=None, **kwargs):
+
+		"""
+		Send a request to the api, and return the json of the response (None if there is no content)
+
+		Raise a :class:`HTTPException` or a :class:`ConnexionError` as Bot.api_call
+		"""
+
+		return await send_request(self.ratelimiter, self.retry_policy, self.get_session(), self.api_url, path, method, files=files, **kwargs)
+
+	async def close(self):
+		if self.own_session and self.session is not None:
+			await self.session.close()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *args):
+		await self.close()
+
+
+def embed_json(embed):
+	return embed.to_json() if hasattr(embed, "to_json") else embed
+
+def embed_characters(embed):
+
+	"""
+	The number of characters of an embed (as json) counted in the limit of 6000 (see Embed.characters)
+	"""
+
+	texts = [embed.get("title"), embed.get("description"), (embed.get("footer") or {}).get("text"), (embed.get("author") or {}).get("name")]
+	for field in embed.get("fields") or []:
+		texts += [field.get("name"), field.get("value")]
+	return sum(len(text) for text in texts if text)
+
+
+class PartialWebhook:
+
+	"""
+	A webhook used by a :class:`WebhookClient`, known by its id and token
+
+	id:
+		ID of the webhook
+	token:
+		The token of the webhook
+	"""
+
+	def __init__(self, client, id, token):
+		self.id = id
+		self.token = token
+		self.client = client
+		self.path = f"/webhooks/{id}/{token}"
+
+	def __repr__(self):
+		return f"PartialWebhook({self.id})"
+
+	async def send(self, content=None, embeds=None, files=None, wait=False, thread_id=None, **kwargs):
+
+		"""
+		Send a message with the webhook
+		Parameters : https://discord.com/developers/docs/resources/webhook#execute-webhook
+
+		embeds:
+			List of embeds (:class:`Embed` or dicts), max 10
+		files:
+			List of files, as in TextChannel.send
+		wait:
+			If True, wait for the message to be created and return it (a dict), else return None
+		"""
+
+		payload = {key: value for key, value in kwargs.items() if value is not None}
+		if content is not None:
+			payload["content"] = content
+		if embeds:
+			payload["embeds"] = [embed_json(embed) for embed in embeds]
+		params = {}
+		if wait:
+			params["wait"] = "true"
+		if thread_id:
+			params["thread_id"] = thread_id
+		return await self.client.request(self.path, "POST", files=files, json=payload, params=params)
+
+	async def send_embeds(self, embeds, wait=False, **kwargs):
+
+		"""
+		Send many embeds, by messages of 10 embeds and 6000 characters (the max by message)
+
+		The messages are sent in order. Return the list of the results of send
+		"""
+
+		messages = []
+		characters = 0
+		for embed in embeds:
+			embed = embed_json(embed)
+			size = embed_characters(embed)
+			if not messages or len(messages[-1]) == 10 or characters + size > Embed.LIMITS["total"]:
+				messages.append([])
+				characters = 0
+			messages[-1].append(embed)
+			characters += size
+		results = []
+		for message in messages:
+			results.append(await self.send(embeds=message, wait=wait, **kwargs))
+		return results
+
+	async def edit_message(self, message_id, **modifs):
+		return await self.client.request(f"{self.path}/messages/{message_id}", "PATCH", json=modifs)
+
+	async def delete_message(self, message_id):
+		await self.client.request(f"{self.path}/messages/{message_id}", "DELETE")
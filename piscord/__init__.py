@@ -2,4 +2,10 @@ from .Piscord import *
 from .API_Elements import *
 from .OAuth import *
 from . import Permission
-from .modules.Handler import Handler
\ No newline at end of file
+from . import Filters
+from .RateLimit import RetryPolicy
+from .Sinks import FileSink, UnixSocketSink, QueueSink, RedisSink
+from .WebhookClient import WebhookClient, PartialWebhook
+from .Broadcast import BroadcastResult
+from .modules.Handler import Handler
+from .modules.Cooldown import cooldown, max_concurrency
\ No newline at end of file
@@ -0,0 +1,266 @@
+import asyncio
+import inspect
+import re
+
+from ..Errors import ArgumentError, CooldownError, MaxConcurrencyError
+
+ARGUMENT = re.compile(r"\s*(?:\"([^\"]*)\"|(\S+))")
+MENTION = re.compile(r"<(?:@!?|@&|#)?(\d+)>|(\d+)$")
+
+def mention_id(text):
+	match = MENTION.match(text)
+	if not match:
+		raise ValueError("not a mention or an id")
+	return match.group(1) or match.group(2)
+
+def convert_bool(message, text):
+	lowered = text.lower()
+	if lowered in ("yes", "y", "true", "on", "1"):
+		return True
+	if lowered in ("no", "n", "false", "off", "0"):
+		return False
+	raise ValueError("not a boolean")
+
+def in_guild(attribute):
+
+	"""
+	Create a converter which finds a mentionned element of the guild in the bot cache (without request)
+	"""
+
+	def convert(message, text):
+		element_id = mention_id(text)
+		if message.guild:
+			for element in getattr(message.guild, attribute):
+				if element.id == element_id:
+					return element
+		raise ValueError(f"not found in the guild {attribute}")
+	return convert
+
+def convert_user(message, text):
+	try:
+		return in_guild("members")(message, text)
+	except ValueError:
+		user_id = mention_id(text)
+		for user in message.mentions:
+			if user.id == user_id:
+				return user
+		raise
+
+"""
+The converters, by annotation name : called with the message and the text of the argument
+The names are used instead of the classes, so the classes of piscord.API_Elements work too
+"""
+
+CONVERTERS = {
+	"str": lambda message, text: text,
+	"int": lambda message, text: int(text),
+	"float": lambda message, text: float(text),
+	"bool": convert_bool,
+	"Member": in_guild("members"),
+	"User": convert_user,
+	"Role": in_guild("roles"),
+	"Channel": in_guild("channels"),
+	"TextChannel": in_guild("channels"),
+	"VoiceChannel": in_guild("channels"),
+	"CategoryChannel": in_guild("channels")
+}
+
+def get_converter(annotation):
+	if annotation is inspect.Parameter.empty:
+		return CONVERTERS["str"]
+	name = annotation if isinstance(annotation, str) else getattr(annotation, "__name__", None)
+	if name in CONVERTERS:
+		return CONVERTERS[name]
+	if callable(annotation):
+		return lambda message, text: annotation(text)
+	raise TypeError(f"No converter for the annotation {annotation}")
+
+
+class Command:
+
+	"""
+	Represent a command of the Handler
+
+	The arguments of the command are given to the function after the message,
+	converted according to the annotations of the function :
+
+		@bot.command
+		def ban(message, member: Member, days: int = 0, *, reason: str = None):
+			...
+
+	For the message "!ban @someone 7 spam and insults", the function is called with
+	the :class:`Member` (found in the cache of the guild), 7, and reason="spam and insults".
+
+	Supported annotations are str (default), int, float, bool, Member, User, Role, Channel (by mention or id),
+	or any function taking the text. A keyword-only argument receives the rest of the message,
+	and *args receives all the remaining arguments.
+
+	The signature is read once, when the command is created,
+	with the cooldowns and concurrency limit of the function (see :func:`cooldown` and :func:`max_concurrency`).
+
+	The function can be a coroutine function (async def) : calling the command then returns a coroutine,
+	which the Handler runs in the event loop of the bot.
+
+	The middlewares are functions middleware(message, next) called before the command, in their order :
+	next() runs the rest of the chain (the next middlewares then the command) and returns its result.
+	A middleware can stop the command by not calling next, or by raising a :class:`CommandError`.
+	They are compiled with the command in a single callable, when the command is created.
+	With an async command, next() returns a coroutine : the middleware can be async and await it.
+
+	name:
+		The name of the command
+	aliases:
+		The other names of the command
+	function:
+		The function of the command
+	is_async:
+		True if the function is a coroutine function
+	"""
+
+	def __init__(self, function, name=None, aliases=(), middlewares=()):
+		self.function = function
+		self.is_async = inspect.iscoroutinefunction(function)
+		self.name = name or function.__name__
+		self.aliases = list(aliases)
+		self.arguments = []
+		self.variadic = None
+		self.rest = None
+		self.cooldowns = getattr(function, "__cooldowns__", [])
+		self.concurrency = getattr(function, "__max_concurrency__", None)
+
+		parameters = list(inspect.signature(function).parameters.values())[1:]
+		for parameter in parameters:
+			converter = get_converter(parameter.annotation)
+			if parameter.kind == parameter.VAR_POSITIONAL:
+				self.variadic = converter
+			elif parameter.kind == parameter.KEYWORD_ONLY:
+				if self.rest is None:
+					self.rest = (parameter.name, converter, parameter.default)
+			elif parameter.kind != parameter.VAR_KEYWORD:
+				self.arguments.append((parameter.name, converter, parameter.default))
+
+		self.compile(middlewares)
+
+	def __repr__(self):
+		return f"Command(\"{self.name}\")"
+
+	def parse(self, message, text):
+
+		"""
+		Convert the text after the command to the arguments of the function
+
+		Return the args and the kwargs, raise :class:`ArgumentError` if an argument is missing or invalid
+		"""
+
+		args = []
+		kwargs = {}
+		position = 0
+
+		def convert(name, converter, value):
+			try:
+				return converter(message, value)
+			except (ValueError, TypeError) as error:
+				raise ArgumentError(name, error)
+
+		def next_argument():
+			nonlocal position
+			match = ARGUMENT.match(text, position)
+			if not match:
+				return
+			position = match.end()
+			return match.group(1) if match.group(1) is not None else match.group(2)
+
+		for name, converter, default in self.arguments:
+			value = next_argument()
+			if value is None:
+				if default is inspect.Parameter.empty:
+					raise ArgumentError(name, "missing argument")
+				args.append(default)
+			else:
+				args.append(convert(name, converter, value))
+
+		if self.variadic:
+			value = next_argument()
+			while value is not None:
+				args.append(convert("*args", self.variadic, value))
+				value = next_argument()
+
+		if self.rest:
+			name, converter, default = self.rest
+			value = text[position:].strip()
+			if value:
+				kwargs[name] = convert(name, converter, value)
+			elif default is inspect.Parameter.empty:
+				raise ArgumentError(name, "missing argument")
+
+		return args, kwargs
+
+	def compile(self, middlewares=()):
+
+		"""
+		Build the callable running the middlewares then the command, used when the command is called
+
+		middlewares:
+			List of functions middleware(message, next)
+		"""
+
+		call = self.invoke_async if self.is_async else self.invoke
+		for middleware in reversed(middlewares):
+			call = self.__layer(middleware, call)
+		self.callback = call
+
+	def __layer(self, middleware, call):
+		if self.is_async:
+			async def layer(message, text):
+				result = middleware(message, lambda: call(message, text))
+				if inspect.isawaitable(result):
+					result = await result
+				return result
+		else:
+			def layer(message, text):
+				result = middleware(message, lambda: call(message, text))
+				if inspect.iscoroutine(result):
+					# an async middleware with a sync command, run in the thread of the command
+					result = asyncio.run(result)
+				return result
+		return layer
+
+	def prepare(self, message, text):
+
+		"""
+		Check the cooldowns and return the arguments of the function
+		"""
+
+		for cooldown in self.cooldowns:
+			retry_after = cooldown.update(message)
+			if retry_after:
+				raise CooldownError(retry_after)
+		if not self.arguments and not self.variadic and not self.rest:
+			return [], {}
+		return self.parse(message, text)
+
+	def invoke(self, message, text=""):
+		args, kwargs = self.prepare(message, text)
+		if self.concurrency is None:
+			return self.function(message, *args, **kwargs)
+		if not self.concurrency.acquire(message):
+			raise MaxConcurrencyError()
+		try:
+			return self.function(message, *args, **kwargs)
+		finally:
+			self.concurrency.release(message)
+
+	async def invoke_async(self, message, text=""):
+		args, kwargs = self.prepare(message, text)
+		if self.concurrency is None:
+			return await self.function(message, *args, **kwargs)
+		if not self.concurrency.acquire(message):
+			raise MaxConcurrencyError()
+		try:
+			return await self.function(message, *args, **kwargs)
+		finally:
+			# released when the command ends, not when the coroutine is created
+			self.concurrency.release(message)
+
+	def __call__(self, message, text=""):
+		return self.callback(message, text)
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+"""
+The buckets : the key of a message, the cooldowns and concurrency limits are counted by key
+"""
+
+BUCKETS = {
+	"user": lambda message: message.author.id if message.author else None,
+	"channel": lambda message: message.channel_id,
+	"guild": lambda message: message.guild_id or message.channel_id,
+	"global": lambda message: None
+}
+
+
+class Cooldown:
+
+	"""
+	Limit the uses of a command to 'rate' uses every 'per' seconds, by bucket (user, channel, guild or global)
+
+	This is a token bucket : each key has 'rate' tokens, a use takes one, and they are given back
+	progressively, at 'rate' tokens every 'per' seconds.
+
+	The keys are kept ordered by last use : a key unused for 'per' seconds has all its tokens,
+	so it is removed from the front of the dict. Each use removes the expired keys, without scanning the others.
+	"""
+
+	def __init__(self, rate, per, bucket="user"):
+		self.rate = rate
+		self.per = per
+		self.bucket = bucket
+		self.key = BUCKETS[bucket]
+		self.keys = OrderedDict()
+		self.lock = threading.Lock()
+
+	def update(self, message):
+
+		"""
+		Use a token for the message
+
+		Return 0 if the command can be used, else the time (in seconds) before a token is available
+		"""
+
+		key = self.key(message)
+		now = time.monotonic()
+		with self.lock:
+			self.expire(now)
+			tokens, updated = self.keys.pop(key, (self.rate, now))
+			tokens = min(self.rate, tokens + (now - updated) * self.rate / self.per)
+			if tokens < 1:
+				self.keys[key] = (tokens, now)
+				return (1 - tokens) * self.per / self.rate
+			self.keys[key] = (tokens - 1, now)
+			return 0
+
+	def reset(self, message):
+		with self.lock:
+			self.keys.pop(self.key(message), None)
+
+	def expire(self, now):
+		while self.keys:
+			key, (tokens, updated) = next(iter(self.keys.items()))
+			if now - updated < self.per:
+				break
+			del self.keys[key]
+
+
+class MaxConcurrency:
+
+	"""
+	Limit the number of uses of a command running at the same time, by bucket
+
+	Only the keys with running commands are kept
+	"""
+
+	def __init__(self, number, bucket="global"):
+		self.number = number
+		self.bucket = bucket
+		self.key = BUCKETS[bucket]
+		self.running = {}
+		self.lock = threading.Lock()
+
+	def acquire(self, message):
+
+		"""
+		Return True if the command can run, and count it as running until release is called
+		"""
+
+		key = self.key(message)
+		with self.lock:
+			count = self.running.get(key, 0)
+			if count >= self.number:
+				return False
+			self.running[key] = count + 1
+			return True
+
+	def release(self, message):
+		key = self.key(message)
+		with self.lock:
+			count = self.running.pop(key, 1) - 1
+			if count > 0:
+				self.running[key] = count
+
+
+def cooldown(rate, per, bucket="user"):
+
+	"""
+	Decorator to add a :class:`Cooldown` to a command, to put under the command decorator :
+
+		@bot.command
+		@cooldown(1, 10, "channel")
+		def weather(message):
+			...
+
+	When the command is in cooldown, a :class:`CooldownError` is given to the event on_command_error
+	"""
+
+	def add_cooldown(function):
+		function.__cooldowns__ = getattr(function, "__cooldowns__", []) + [Cooldown(rate, per, bucket)]
+		return function
+	return add_cooldown
+
+
+def max_concurrency(number, bucket="global"):
+
+	"""
+	Decorator to limit the number of uses of a command running at the same time, to put under the command decorator
+
+	When the limit is reached, a :class:`MaxConcurrencyError` is given to the event on_command_error
+	"""
+
+	def add_max_concurrency(function):
+		function.__max_concurrency__ = MaxConcurrency(number, bucket)
+		return function
+	return add_max_concurrency
@@ -1,72 +1,262 @@
+import asyncio
+import importlib.util
+import inspect
+import os
+from threading import Thread
+
 from ..Piscord import Bot
+from ..Errors import CommandError
+from .Router import CommandRouter, FIRST_WORD
+from .Command import Command
+from .Prefixes import PrefixStore
 
 class Handler(Bot):
 
-	def __init__(self, token, prefix, api_sleep=0.05, shards=[0,1], verif_command=None):
+	def __init__(self, token, prefix, api_sleep=0.05, shards=[0,1], verif_command=None, prefix_store=None):
 
 		Bot.__init__(self, token, api_sleep=api_sleep, shards=shards)
 
 		self.prefix = prefix
+		self.prefix_store = prefix_store if prefix_store is not None else PrefixStore()
+		self.router = CommandRouter(prefix, self.prefix_store)
 		self.commands = {}
+		self.middlewares = []
 		self.ext = {}
 		self.on_message = None
 		self.verif_command = self.verif
 		if verif_command:
 			self.verif_command = verif_command
 
+		def handle_command(message):
+			found = self.find_command(message)
+			if found:
+				command, end = found
+				try:
+					result = command(message, message.content[end:])
+					if inspect.isawaitable(result):
+						self.run_command(message, result)
+				except CommandError as error:
+					self.command_error(message, error)
+
 		def handle(message):
-			command = self.verif_command(message)
-			if command:
-				if command in self.commands:
-					self.commands[command](message)
+			handle_command(message)
 			if self.on_message:
 				self.on_message(message)
 
 		self.events["on_message"] = handle
+		# the filter of on_message only applies to the function of the user, the commands are always handled
+		self.fallbacks["on_message"] = handle_command
+
+	def command_error(self, message, error):
+		if "on_command_error" in self.events:
+			self.events["on_command_error"](message, error)
+
+	def run_command(self, message, coroutine):
+
+		"""
+		Run an async command in the event loop of the bot, without waiting for its end
+
+		In an async command, the requests should be awaited (with the _async methods or Bot.api_async) :
+		the sync methods would block the event loop
+		"""
+
+		loop = getattr(self, "loop", None)
+		if loop is None or not loop.is_running():
+			try:
+				self.run_coroutine(coroutine)
+			except CommandError as error:
+				self.command_error(message, error)
+			return
+
+		def done(future):
+			try:
+				future.result()
+			except CommandError as error:
+				# the event is sync, it is not run in the event loop
+				Thread(target=self.command_error, args=(message, error)).start()
+
+		asyncio.run_coroutine_threadsafe(coroutine, loop).add_done_callback(done)
+
+	def middleware(self, function):
+
+		"""
+		Decorator to add a middleware, called before each command :
+
+			@bot.middleware
+			def log(message, next):
+				start = time.perf_counter()
+				result = next()
+				print(message.content, time.perf_counter() - start)
+				return result
+
+		See :class:`Command` for the middlewares with async commands
+		"""
+
+		self.middlewares.append(function)
+		for command in self.commands.values():
+			command.compile(self.middlewares)
+		return function
 
 	def verif(self, message):
-		if message.content.startswith(self.prefix):
-			return message.content.split()[0][len(self.prefix):]
+		if message.content:
+			command = self.router.route(message.content, message.guild_id)
+			if command:
+				return command[0]
 
-	def command(self, arg):
+	def find_command(self, message):
 
-		def add_command(function):
-			self.commands[arg]=function
+		"""
+		Return the :class:`Command` of the message and the position where its arguments start, or None
+
+		The commands are read once : a module reloaded meanwhile does not change the command found
+		"""
+
+		commands = self.commands
+		if self.verif_command == self.verif:
+			if message.content:
+				route = self.router.route(message.content, message.guild_id)
+				if route and route[0] in commands:
+					return commands[route[0]], route[1]
 			return
+		command = commands.get(self.verif_command(message))
+		if command:
+			return command, FIRST_WORD.match(message.content).end()
 
-		if type(arg) == str:
-			return add_event
+	def set_prefix(self, guild_id, prefix):
+
+		"""
+		Set the prefix (or a list of prefixes) of a guild. None to use the default prefix
+
+		The prefixes are saved in the backend of Handler.prefix_store (see :class:`PrefixStore`)
+		"""
+
+		self.router.set_guild_prefixes(guild_id, prefix)
+
+	def get_prefix(self, guild_id):
+
+		"""
+		Return the list of prefixes of a guild, or None if it uses the default prefix
+		"""
+
+		return self.prefix_store.get(guild_id)
 
-		self.commands[arg.__name__] = arg
-		return
+	def add_command(self, name, function, aliases=()):
 
-	def event(self,arg):
+		"""
+		Add a command, with its arguments read from the function annotations (see :class:`Command`)
+		"""
+
+		self.commands[name] = Command(function, name, aliases, self.middlewares)
+		self.router.add_command(name, aliases)
+
+	def remove_command(self, name):
+		if name in self.commands:
+			del self.commands[name]
+		self.router.remove_command(name)
+
+	def command(self, arg=None, aliases=()):
+
+		def add_command(function):
+			self.add_command(arg or function.__name__, function, aliases)
+			return function
+
+		if arg is None or type(arg) == str:
+			return add_command
+
+		self.add_command(arg.__name__, arg)
+		return arg
+
+	def event(self, arg=None, filter=None):
+
+		"""
+		Same as Bot.event. The filter of on_message is only used for the function of the user :
+		the messages it rejects are still read as commands
+		"""
 
 		def add_event(function):
-			if arg == "on_message":
-				self.on_message = function
-				return
-			self.events[arg]=function
-			return
+			name = arg or function.__name__
+			if name != "on_message":
+				return Bot.event(self, name, filter)(function)
+			self.on_message = function
+			if filter:
+				self.filters[name] = filter
+			else:
+				self.filters.pop(name, None)
+			return function
 
-		if type(arg) == str:
+		if arg is None or type(arg) == str:
 			return add_event
-
-		if arg.__name__ == "on_message":
-			self.on_message = arg
-			return
-		self.events[arg.__name__] = arg
-		return
+		return add_event(arg)
 
 	def load_module(self, name):
-		self.ext[name] = Ext_Handler(self, name)
-		with open(f"commands/{name}.py","r", encoding="utf-8") as file:
-			exec(file.read(), {**globals(),"bot":self.ext[name]})
+
+		"""
+		Load the commands of the module commands/{name}.py, where the 'bot' variable is used to add commands
+
+		The module is compiled from its source at each loading : no cached bytecode is used,
+		so a reload always runs the current version of the file.
+		Its commands are added all at once, once the module is loaded : if it raises an error, nothing is changed.
+		If the module defines a function setup(bot), it is called after the loading,
+		and a function teardown(bot) is called when the module is unloaded.
+
+		If the module is already loaded, it is reloaded (see Handler.reload_module)
+		"""
+
+		ext = Ext_Handler(self, name)
+		path = os.path.join("commands", f"{name}.py")
+		spec = importlib.util.spec_from_file_location(f"commands.{name}", path)
+		module = importlib.util.module_from_spec(spec)
+		# the modules were executed with the globals of this file, they are kept available
+		module.__dict__.update({key: value for key, value in globals().items() if not key.startswith("__")})
+		module.bot = ext
+		# the .pyc files are checked by the modification time (to the second) and the size of the source :
+		# a file edited twice in a second would be reloaded from an outdated .pyc
+		with open(path, "rb") as file:
+			code = compile(file.read(), path, "exec")
+		exec(code, module.__dict__)
+		if hasattr(module, "setup"):
+			module.setup(ext)
+		ext.module = module
+
+		old = self.ext.get(name)
+		self.__swap_commands(old.commands if old else {}, ext.commands)
+		self.ext[name] = ext
+		if old:
+			old.teardown()
+
+	def reload_module(self, name):
+
+		"""
+		Load again a module, after its file was modified
+
+		The new commands replace the old ones at once : the commands can be used during the reload,
+		and if the new version raises an error, the old one stays loaded
+		"""
+
+		self.load_module(name)
 
 	def unload_module(self, name):
 		if name in self.ext:
-			for x in self.ext[name].commands:
-				del self.commands[x]
+			ext = self.ext.pop(name)
+			self.__swap_commands(ext.commands, {})
+			ext.teardown()
+
+	def __swap_commands(self, removed, added):
+		commands = dict(self.commands)
+		aliases = dict(self.router.aliases)
+		for name in removed:
+			commands.pop(name, None)
+		for alias, name in list(aliases.items()):
+			if name in removed:
+				del aliases[alias]
+		for name, command in added.items():
+			commands[name] = command
+			aliases[name] = name
+			for alias in command.aliases:
+				aliases[alias] = name
+		# the dicts are replaced, not modified : the messages handled meanwhile use the old or the new commands
+		self.router.aliases = aliases
+		self.commands = commands
 
 class Ext_Handler:
 
@@ -75,18 +265,22 @@ class Ext_Handler:
 		self.__handler = handler
 		self.prefix = handler.prefix
 		self.name = name
-		self.commands = []
+		self.commands = {}
+		self.module = None
 
-	def command(self, arg):
+	def command(self, arg=None, aliases=()):
 
 		def add_command(function):
-			self.__handler.commands[arg]=function
-			self.commands.append(arg)
-			return
+			name = arg or function.__name__
+			self.commands[name] = Command(function, name, aliases, self.__handler.middlewares)
+			return function
 
-		if type(arg) == str:
-			return add_event
+		if arg is None or type(arg) == str:
+			return add_command
+
+		self.commands[arg.__name__] = Command(arg, middlewares=self.__handler.middlewares)
+		return arg
 
-		self.__handler.commands[arg.__name__] = arg
-		self.commands.append(arg.__name__)
-		return
\ No newline at end of file
+	def teardown(self):
+		if hasattr(self.module, "teardown"):
+			self.module.teardown(self)
\ No newline at end of file
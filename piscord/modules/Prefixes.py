@@ -0,0 +1,132 @@
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from .Router import PrefixTrie
+
+class DictBackend:
+
+	"""
+	Keep the prefixes of the guilds in a dict (lost when the bot stops)
+	"""
+
+	def __init__(self, prefixes=None):
+		self.prefixes = prefixes if prefixes is not None else {}
+
+	def get(self, guild_id):
+		return self.prefixes.get(guild_id)
+
+	def set(self, guild_id, prefixes):
+		self.prefixes[guild_id] = prefixes
+
+	def delete(self, guild_id):
+		self.prefixes.pop(guild_id, None)
+
+
+class SQLiteBackend:
+
+	"""
+	Keep the prefixes of the guilds in a SQLite database
+
+	path:
+		The path of the database file
+	"""
+
+	def __init__(self, path):
+		self.connection = sqlite3.connect(path, check_same_thread=False)
+		self.lock = threading.Lock()
+		with self.lock, self.connection:
+			self.connection.execute("CREATE TABLE IF NOT EXISTS prefixes (guild_id TEXT PRIMARY KEY, prefixes TEXT)")
+
+	def get(self, guild_id):
+		with self.lock:
+			row = self.connection.execute("SELECT prefixes FROM prefixes WHERE guild_id = ?", (guild_id,)).fetchone()
+		if row:
+			return json.loads(row[0])
+
+	def set(self, guild_id, prefixes):
+		with self.lock, self.connection:
+			self.connection.execute("REPLACE INTO prefixes VALUES (?, ?)", (guild_id, json.dumps(prefixes)))
+
+	def delete(self, guild_id):
+		with self.lock, self.connection:
+			self.connection.execute("DELETE FROM prefixes WHERE guild_id = ?", (guild_id,))
+
+	def close(self):
+		self.connection.close()
+
+
+class PrefixStore:
+
+	"""
+	The prefixes of the guilds, read from a backend through a LRU cache
+
+	The cache keeps the :class:`PrefixTrie` of the last used guilds, and also remembers the guilds
+	without prefixes : resolving the prefixes of a message is a dict lookup, the backend is only read
+	for the guilds which are not in the cache.
+
+	backend:
+		Where the prefixes are kept : :class:`DictBackend` (default), :class:`SQLiteBackend`,
+		or any object with the methods get(guild_id), set(guild_id, prefixes) and delete(guild_id)
+	size:
+		The max number of guilds in the cache
+	"""
+
+	def __init__(self, backend=None, size=10000):
+		self.backend = backend if backend is not None else DictBackend()
+		self.size = size
+		self.cache = OrderedDict()
+		self.lock = threading.Lock()
+		self.writes = 0
+
+	def get(self, guild_id):
+
+		"""
+		Return the prefixes of the guild, None if the guild has no prefixes
+		"""
+
+		prefixes = self.backend.get(guild_id)
+		if isinstance(prefixes, str):
+			prefixes = [prefixes]
+		return prefixes
+
+	def get_trie(self, guild_id):
+
+		"""
+		Return the :class:`PrefixTrie` of the guild, None if the guild has no prefixes
+		"""
+
+		with self.lock:
+			if guild_id in self.cache:
+				self.cache.move_to_end(guild_id)
+				return self.cache[guild_id]
+			writes = self.writes
+
+		prefixes = self.get(guild_id)
+		trie = PrefixTrie(prefixes) if prefixes is not None else None
+
+		with self.lock:
+			if writes != self.writes:
+				# prefixes were set during the read, the result may be outdated
+				return trie
+			self.cache[guild_id] = trie
+			if len(self.cache) > self.size:
+				self.cache.popitem(last=False)
+		return trie
+
+	def set(self, guild_id, prefixes):
+
+		"""
+		Set the prefixes of the guild, None to remove them
+		"""
+
+		if prefixes is None:
+			self.backend.delete(guild_id)
+		else:
+			if isinstance(prefixes, str):
+				prefixes = [prefixes]
+			self.backend.set(guild_id, list(prefixes))
+		with self.lock:
+			self.writes += 1
+			self.cache.pop(guild_id, None)
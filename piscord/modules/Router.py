@@ -0,0 +1,110 @@
+import re
+
+FIRST_WORD = re.compile(r"\S*")
+
+class PrefixTrie:
+
+	"""
+	Trie of the command prefixes
+
+	Finding the prefix of a message only reads its first characters :
+	a message which does not start with a prefix is rejected on its first character.
+	"""
+
+	def __init__(self, prefixes=()):
+		self.root = {}
+		for prefix in prefixes:
+			self.add(prefix)
+
+	def add(self, prefix):
+		node = self.root
+		for char in prefix:
+			node = node.setdefault(char, {})
+		node[None] = prefix
+
+	def match(self, text):
+
+		"""
+		Return the length of the longest prefix at the beginning of the text, or -1 if there is no prefix
+		"""
+
+		node = self.root
+		found = -1
+		for i, char in enumerate(text):
+			if None in node:
+				found = i
+			node = node.get(char)
+			if node is None:
+				return found
+		if None in node:
+			found = len(text)
+		return found
+
+
+class CommandRouter:
+
+	"""
+	Find the command of a message
+
+	prefixes:
+		The default prefixes, used in every guild without its own prefixes
+	aliases:
+		Dict of the command names and aliases, with the name of the corresponding command
+	store: :class:`PrefixStore`
+		The prefixes of the guilds with their own prefixes (None until a guild gets its own prefixes)
+	"""
+
+	def __init__(self, prefixes, store=None):
+		if isinstance(prefixes, str):
+			prefixes = [prefixes]
+		self.prefixes = PrefixTrie(prefixes)
+		self.aliases = {}
+		self.store = store
+
+	def add_command(self, name, aliases=()):
+		self.aliases[name] = name
+		for alias in aliases:
+			self.aliases[alias] = name
+
+	def remove_command(self, name):
+		for alias, command in list(self.aliases.items()):
+			if command == name:
+				del self.aliases[alias]
+
+	def set_guild_prefixes(self, guild_id, prefixes):
+
+		"""
+		Use other prefixes in a guild. None to use the default prefixes
+
+		Without store, the prefixes are kept in memory by a new :class:`PrefixStore`
+		"""
+
+		if self.store is None:
+			# imported here : the Prefixes module uses the PrefixTrie of this module
+			from .Prefixes import PrefixStore
+			self.store = PrefixStore()
+		self.store.set(guild_id, prefixes)
+
+	def get_prefixes(self, guild_id):
+		if guild_id is None or self.store is None:
+			return self.prefixes
+		trie = self.store.get_trie(guild_id)
+		return self.prefixes if trie is None else trie
+
+	def route(self, content, guild_id=None):
+
+		"""
+		Return the name of the command of a message and the position of the end of the command,
+		or None if the message is not a command.
+
+		Only the prefix and the first word are read, the rest of the message is not split
+		"""
+
+		start = self.get_prefixes(guild_id).match(content)
+		if start < 0:
+			return
+		end = FIRST_WORD.match(content, start).end()
+		command = self.aliases.get(content[start:end])
+		if command is None:
+			return
+		return command, end
@@ -23,4 +23,5 @@ setuptools.setup(
     ],
     python_requires='>=3.6',
     install_requires=requires.splitlines(),
+    extras_require={"voice": ["PyNaCl"], "audio": ["PyNaCl", "numpy"]},
 )
\ No newline at end of file
@@ -1,8 +1,24 @@
-from .imports import Bot,Permission
-
-from unittest.mock import Mock,patch
+from .imports import Bot,Permission,Filters,HistoryIterator,QueueSink,FileSink,WebhookClient,RetryPolicy
+from piscord.Events import Events,event_list_item
+from piscord.Voice import Voice_Client,AudioStream,JitterBuffer,VoiceReceiver
+from piscord.Gateway import VoiceGateway
+from piscord.Audio import OggReader,PCMSource,GeneratorSource,VolumeSource,Mixer,AudioSource,FRAME_SAMPLES,FRAME_SIZE
+from piscord.API_Elements2 import Guild,Member,Role,Embed,TextChannel,File
+from piscord.modules.Router import CommandRouter
+from piscord.modules.Prefixes import PrefixStore,SQLiteBackend
+from piscord.modules.Command import Command
+from piscord.modules.Handler import Handler
+from piscord.Errors import ArgumentError,CooldownError,MaxConcurrencyError,EmbedError,NotFound,ServerError,HTTPException,PermissionsError,PurgeError,RateLimited,FileError,TokenError
+from piscord.modules.Cooldown import cooldown,max_concurrency
+
+from unittest.mock import Mock,AsyncMock,patch
+from contextlib import asynccontextmanager
+from aiohttp import web
 import pytest
+import asyncio
 import json
+import time
+import websockets
 
 with open("calls.json","r") as f:
 	calls = json.load(f)
@@ -13,9 +29,30 @@ with open("responses.json","r") as f:
 async def api_call(path, method="GET", **kwargs):
 	return responses[f"{path} {method}"]
 
+# the request of the bot, for the tests using a local server
+bot_api_call = Bot.api_call
 Bot.api_call = Mock()
 Bot.api_call.side_effect = api_call
 
+@asynccontextmanager
+async def api_server(*routes):
+
+	"""
+	Run a local server with the routes (method, path, handler), and give its url
+	"""
+
+	app = web.Application()
+	for method, path, handler in routes:
+		app.router.add_route(method, path, handler)
+	runner = web.AppRunner(app)
+	await runner.setup()
+	await web.TCPSite(runner, "127.0.0.1", 0).start()
+	try:
+		host, port = runner.addresses[0][:2]
+		yield f"http://{host}:{port}"
+	finally:
+		await runner.cleanup()
+
 @pytest.fixture()
 def bot_ready():
 	bot = Bot("")
@@ -146,4 +183,839 @@ def test_permissions(bot_guilds):
 	assert (perm_2 - 5).real == 2
 
 	perm_2 -= Permission.KICK_MEMBERS
-	assert perm_2.real == 4
\ No newline at end of file
+	assert perm_2.real == 4
+
+def test_history_iterator():
+	ids = list(range(1000,0,-1))
+	requests = []
+
+	class Paginated:
+		async def api_async(self, path, method="GET", params={}):
+			requests.append(params)
+			if "after" in params:
+				return [{"id":str(i)} for i in ids if i > int(params["after"])][-params["limit"]:]
+			return [{"id":str(i)} for i in ids if i < int(params.get("before",2000))][:params["limit"]]
+
+	async def collect(**kwargs):
+		return [int(message["id"]) async for message in HistoryIterator(Paginated(),"1",lambda message: message,**kwargs)]
+
+	messages = asyncio.run(collect(limit=250))
+	assert messages == ids[:250]
+	assert [params["limit"] for params in requests] == [100,100,50]
+
+	assert asyncio.run(collect(after=900)) == list(range(901,1001))
+	assert asyncio.run(collect(before=500,after=250)) == list(range(499,250,-1))
+	assert len(asyncio.run(collect())) == 1000
+
+	bot = Bot("token")
+	bot.api_async = Paginated().api_async
+	channel = TextChannel({"id": "1", "type": 0, "guild_id": "1"}, bot, Mock())
+
+	async def history():
+		return [message async for message in channel.history(limit=150, before=900)]
+
+	messages = asyncio.run(history())
+	assert [int(message.id) for message in messages] == list(range(899,749,-1))
+	assert all(type(message).__name__ == "Message" for message in messages)
+
+def test_purge():
+	now = (int(time.time() * 1000) - 1420070400000) << 22
+	ids = [now - i for i in range(250)]
+
+	def channel(fail=None):
+		bot = Bot("token")
+		bot.deletes = []
+
+		async def api_async(path, method="GET", params={}, json=None):
+			if method == "GET":
+				before = int(params.get("before", now + 1))
+				return [{"id": str(i), "channel_id": "5"} for i in ids if i < before][:params["limit"]]
+			bot.deletes.append(len(json["messages"]))
+			if len(bot.deletes) == fail:
+				raise PermissionsError(403)
+
+		bot.api_async = api_async
+		return bot, TextChannel({"id": "5", "type": 0, "guild_id": "1"}, bot, Mock())
+
+	bot, text_channel = channel()
+	progress = []
+	assert text_channel.purge(progress=progress.append) == 250
+	assert sorted(bot.deletes) == [50, 100, 100] and progress[-1] == 250
+
+	bot, text_channel = channel(fail=2)
+	with pytest.raises(PurgeError) as error:
+		text_channel.purge()
+	assert len(error.value.errors) == 1 and isinstance(error.value.errors[0], PermissionsError)
+	assert error.value.deleted == sum(bot.deletes) - 100
+
+def test_bulk_members():
+	bot = Bot("token")
+	guild = Guild({"id": "1", "roles": [{"id": "10", "name": "a"}, {"id": "20", "name": "b"}]}, bot)
+	bot.guilds.append(guild)
+	guild.members = [Member({"user": {"id": user_id}, "roles": roles, "guild_id": "1"}, bot)
+		for user_id, roles in (("1", ["10"]), ("2", []), ("3", []), ("4", ["20"]))]
+	requests = []
+
+	async def api_async(path, method="GET", **kwargs):
+		requests.append((method, path))
+		if "/members/3" in path:
+			raise PermissionsError(403)
+
+	bot.api_async = api_async
+	role = guild.roles[0]
+	results = guild.bulk_add_role(role, ["1", "2", "2", guild.members[2], "9"])
+	assert results["1"] is False and results["2"] is True and results["9"] is True
+	assert isinstance(results["3"], PermissionsError)
+	assert sorted(requests) == [("PUT", f"/guilds/1/members/{user_id}/roles/10") for user_id in ("2", "3", "9")]
+	assert guild.members[1].roles_id == ["10"] and guild.members[1].roles == [role]
+	assert guild.members[2].roles_id == []
+
+	requests.clear()
+	assert guild.bulk_remove_role(role, ["1", "4"]) == {"1": True, "4": False}
+	assert requests == [("DELETE", "/guilds/1/members/1/roles/10")] and guild.members[0].roles == []
+
+	results = guild.bulk_edit_members(["4", "2"], roles=["20"], nick="x")
+	assert results == {"4": True, "2": True}
+	assert guild.members[1].roles_id == ["20"] and guild.members[1].roles == [guild.roles[1]] and guild.members[1].nick == "x"
+	assert guild.bulk_edit_members(["2"], roles=["20"], nick="x") == {"2": False}
+
+def test_permissions_for():
+	bot = Bot("")
+	base = Permission.VIEW_CHANNEL + Permission.SEND_MESSAGES
+	guild = Guild({
+		"id": "1",
+		"owner_id": "100",
+		"roles": [
+			{"id": "1", "permissions": base.real},
+			{"id": "2", "permissions": Permission.MANAGE_MESSAGES.real},
+			{"id": "3", "permissions": Permission.ADMINISTRATOR.real}
+		],
+		"channels": [{"id": "10", "type": 0, "guild_id": "1", "permission_overwrites": [
+			{"id": "1", "type": "role", "deny": Permission.SEND_MESSAGES.real},
+			{"id": "2", "type": "role", "allow": Permission.SEND_MESSAGES.real},
+			{"id": "201", "type": "member", "deny": Permission.VIEW_CHANNEL.real}
+		]}]
+	}, bot)
+	channel = guild.channels[0]
+	member = lambda user_id, roles: Member({"user": {"id": user_id}, "roles": roles, "guild_id": "1"}, bot)
+
+	assert channel.permissions_for(member("100", [])) == Permission.ALL_PERMISSIONS
+	assert channel.permissions_for(member("300", ["3"])) == Permission.ALL_PERMISSIONS
+
+	everyone = channel.permissions_for(member("200", []))
+	assert everyone == Permission.VIEW_CHANNEL
+	assert everyone != Permission.SEND_MESSAGES
+
+	moderator = channel.permissions_for(member("201", ["2"]))
+	assert moderator == Permission.SEND_MESSAGES + Permission.MANAGE_MESSAGES
+	assert moderator != Permission.VIEW_CHANNEL
+
+	assert bot.permissions_cache.get(guild, member("200", ["2"]), channel) is everyone
+	bot.permissions_cache.invalidate_member("1", "200")
+	assert channel.permissions_for(member("200", ["2"])) == Permission.SEND_MESSAGES
+
+	events = {"GUILD_ROLE_UPDATE": event_list_item("role_update", lambda bot, data: data, True)}
+	with patch.dict(Events.__EVENTS_LIST__, events):
+		bot.dispatch({"t": "GUILD_ROLE_UPDATE", "d": {"guild_id": "1", "role": {"id": "2"}}})
+	assert len(bot.permissions_cache) == 0
+	channel.permissions_for(member("200", []))
+	bot.permissions_cache.update({"t": "GUILD_MEMBER_UPDATE", "d": {"guild_id": "1", "user": {"id": "200"}, "roles": []}})
+	assert len(bot.permissions_cache) == 0
+
+	def invalidated(*args):
+		bot.permissions_cache.update({"t": "GUILD_ROLE_UPDATE", "d": {"guild_id": "1", "role": {"id": "1"}}})
+		return Permission.VIEW_CHANNEL
+
+	with patch("piscord.Permission.compute_permissions", side_effect=invalidated):
+		channel.permissions_for(member("200", []))
+	assert len(bot.permissions_cache) == 0
+
+	bot.permissions_cache = Permission.PermissionsCache(maxsize=2)
+	for user_id in ("1", "2", "1", "3"):
+		channel.permissions_for(member(user_id, []))
+	assert [key[2] for key in bot.permissions_cache.entries] == ["1", "3"]
+	assert bot.permissions_cache.guilds == {"1": {("1", "10", "1"), ("1", "10", "3")}}
+
+def test_command_router():
+	router = CommandRouter(["!", "!!", "bot "], PrefixStore())
+	router.add_command("ping", aliases=["p"])
+	router.set_guild_prefixes("1", "?")
+
+	assert router.route("!ping") == ("ping", 5)
+	assert router.route("!!p hello world") == ("ping", 3)
+	assert router.route("bot ping") == ("ping", 8)
+	assert router.route("!pong") is None
+	assert router.route("hello !ping") is None
+	assert router.route("") is None
+	assert router.route("!ping", "1") is None
+	assert router.route("?ping", "1") == ("ping", 5)
+
+	router.remove_command("ping")
+	assert router.route("!p") is None
+
+	router = CommandRouter("!")
+	router.add_command("ping")
+	router.set_guild_prefixes("1", "?")
+	assert router.route("?ping", "1") == ("ping", 5) and router.route("!ping", "2") == ("ping", 5)
+
+def test_command_arguments():
+	bot = Bot("")
+	guild = Guild({"id": "1", "roles": [{"id": "5", "name": "mod"}], "members": [{"user": {"id": "42"}}]}, bot)
+	message = Mock(guild=guild, mentions=[])
+
+	def ban(message, member: Member, days: int = 0, *, reason: str = None):
+		return member, days, reason
+	command = Command(ban)
+
+	assert command(message, " <@!42> 7 spam  and insults ") == (guild.members[0], 7, "spam  and insults")
+	assert command(message, "42") == (guild.members[0], 0, None)
+	with pytest.raises(ArgumentError):
+		command(message, "<@43>")
+	with pytest.raises(ArgumentError):
+		command(message, "42 seven")
+
+	def roles(message, *roles: Role):
+		return roles
+	assert Command(roles)(message, "<@&5> 5") == (guild.roles[0], guild.roles[0])
+	assert Command(lambda message, text: text)(message, '"quoted text" other') == "quoted text"
+	assert Command(lambda message: message)(message, "ignored") is message
+
+
+def test_prefix_store(tmp_path):
+	store = PrefixStore(SQLiteBackend(str(tmp_path / "prefixes.db")), size=2)
+	assert store.get_trie("1") is None
+
+	store.set("1", "?")
+	assert store.get("1") == ["?"]
+	assert store.get_trie("1").match("?ping") == 1
+	assert store.get_trie("1") is store.get_trie("1")
+
+	store.set("2", ["$", ">>"])
+	store.get_trie("2")
+	store.get_trie("3")
+	assert list(store.cache) == ["2", "3"]
+
+	store.set("2", None)
+	assert store.get_trie("2") is None
+	assert PrefixStore(store.backend).get("1") == ["?"]
+
+def test_cooldown():
+	message = lambda user_id: Mock(author=Mock(id=user_id))
+
+	@cooldown(2, 60)
+	def weather(message):
+		return "sunny"
+	command = Command(weather)
+
+	assert command(message("1")) == "sunny"
+	assert command(message("1")) == "sunny"
+	with pytest.raises(CooldownError) as error:
+		command(message("1"))
+	assert 0 < error.value.retry_after <= 30
+	assert command(message("2")) == "sunny"
+
+	limit = command.cooldowns[0]
+	limit.keys["1"] = (0, limit.keys["1"][1] - 60)
+	limit.keys.move_to_end("1", last=False)
+	limit.expire(time.monotonic())
+	assert list(limit.keys) == ["2"]
+	assert command(message("1")) == "sunny"
+
+	@max_concurrency(1)
+	def long(message):
+		with pytest.raises(MaxConcurrencyError):
+			Command(long)(message)
+	Command(long)(message("1"))
+
+def test_command_middlewares():
+	calls = []
+
+	def log(message, next):
+		calls.append("log")
+		return next()
+
+	def only_guilds(message, next):
+		if message.guild_id:
+			return next()
+
+	def weather(message, city):
+		calls.append(city)
+		return "sunny"
+
+	command = Command(weather, middlewares=[log, only_guilds])
+	assert command(Mock(guild_id="1"), "Paris") == "sunny"
+	assert command(Mock(guild_id=None), "Paris") is None
+	assert calls == ["log", "Paris", "log"]
+
+	async def timed(message, next):
+		calls.append("before")
+		result = await next()
+		calls.append("after")
+		return result
+
+	@max_concurrency(1)
+	async def forecast(message, days: int):
+		await asyncio.sleep(0)
+		return days * ["sunny"]
+
+	command = Command(forecast, middlewares=[log, timed])
+	assert command.is_async
+	calls.clear()
+	coroutine = command(Mock(author=None), "2")
+	assert calls == []
+	assert asyncio.run(coroutine) == ["sunny", "sunny"]
+	assert calls == ["log", "before", "after"]
+	assert command.concurrency.running == {}
+
+def test_event_filters():
+	bot = Bot("token")
+	created = []
+	events = {
+		"TEST_MESSAGE": event_list_item("on_test", lambda bot, data: created.append(data) or data, False),
+		"TEST_CACHE": event_list_item("on_cache", lambda bot, data: created.append(data) or data, True)
+	}
+
+	@bot.event("on_test", filter=Filters.all_of(Filters.in_guilds("1"), Filters.not_bot))
+	def on_test(data):
+		pass
+
+	with patch.dict(Events.__EVENTS_LIST__, events), patch("piscord.Piscord.Thread") as thread:
+		bot.dispatch({"t": "TEST_MESSAGE", "d": {"guild_id": "2", "author": {"id": "3"}}})
+		bot.dispatch({"t": "TEST_MESSAGE", "d": {"guild_id": "1", "author": {"id": "3", "bot": True}}})
+		bot.dispatch({"t": "TEST_CACHE", "d": {"guild_id": "2"}})
+		assert created == [{"guild_id": "2"}]
+		assert not thread.called
+
+		bot.dispatch({"t": "TEST_MESSAGE", "d": {"guild_id": "1", "author": {"id": "3"}}})
+		thread.assert_called_once_with(target=on_test, args=({"guild_id": "1", "author": {"id": "3"}},))
+
+def test_handler_event_filters():
+	bot = Handler("token", "!")
+	called = []
+	events = {"MESSAGE_CREATE": event_list_item("on_message", lambda bot, data: Mock(content=data["content"], guild_id=None), False)}
+
+	@bot.command
+	def ping(message):
+		called.append(("ping", message.content))
+
+	@bot.event(filter=Filters.not_bot)
+	def on_message(message):
+		called.append(("on_message", message.content))
+
+	@bot.event("on_ready", filter=Filters.in_guilds("1"))
+	def ready(data):
+		pass
+
+	def run(target, args):
+		target(*args)
+		return Mock()
+
+	with patch.dict(Events.__EVENTS_LIST__, events), patch("piscord.Piscord.Thread", side_effect=run):
+		bot.dispatch({"t": "MESSAGE_CREATE", "d": {"content": "!ping", "author": {"id": "1", "bot": True}}})
+		bot.dispatch({"t": "MESSAGE_CREATE", "d": {"content": "hello", "author": {"id": "1", "bot": True}}})
+		bot.dispatch({"t": "MESSAGE_CREATE", "d": {"content": "hi", "author": {"id": "2"}}})
+	assert called == [("ping", "!ping"), ("on_message", "hi")]
+	assert bot.events["on_ready"] is ready and "on_ready" in bot.filters
+
+def test_load_modules(tmp_path, monkeypatch):
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / "commands").mkdir()
+	module = tmp_path / "commands" / "fun.py"
+	module.write_text(
+		"events = []\n"
+		"@bot.command(aliases=['hi'])\n"
+		"def hello(message):\n"
+		"	return 'hello 1'\n"
+		"def setup(bot):\n"
+		"	events.append(('setup', bot.name))\n"
+		"def teardown(bot):\n"
+		"	events.append(('teardown', bot.name))\n")
+	bot = Handler("token", "!")
+	bot.load_module("fun")
+	first = bot.ext["fun"].module
+	assert first.events == [("setup", "fun")]
+	command, end = bot.find_command(Mock(content="!hi", guild_id=None))
+	assert command(Mock(), "") == "hello 1" and end == 3
+
+	module.write_text(module.read_text().replace("hello 1", "hello 2"))
+	bot.reload_module("fun")
+	assert first.events == [("setup", "fun"), ("teardown", "fun")]
+	assert bot.ext["fun"].module.events == [("setup", "fun")]
+	assert command(Mock(), "") == "hello 1"
+	assert bot.find_command(Mock(content="!hello", guild_id=None))[0](Mock(), "") == "hello 2"
+
+	module.write_text("raise ValueError()")
+	with pytest.raises(ValueError):
+		bot.reload_module("fun")
+	assert bot.find_command(Mock(content="!hi", guild_id=None))[0](Mock(), "") == "hello 2"
+
+	second = bot.ext["fun"].module
+	bot.unload_module("fun")
+	assert second.events == [("setup", "fun"), ("teardown", "fun")]
+	assert bot.commands == {} and bot.find_command(Mock(content="!hi", guild_id=None)) is None
+
+def test_wait_for():
+	bot = Bot("token")
+	events = {"TEST_REACTION": event_list_item("on_reaction", lambda bot, data: data, False)}
+
+	async def wait():
+		task = asyncio.ensure_future(bot.wait_for("on_reaction", lambda data: data["user_id"] == "2", timeout=5))
+		await asyncio.sleep(0)
+		assert len(bot.waiters["on_reaction"]) == 1
+		bot.dispatch({"t": "TEST_REACTION", "d": {"user_id": "1"}})
+		bot.dispatch({"t": "TEST_REACTION", "d": {"user_id": "2"}})
+		assert await task == {"user_id": "2"}
+		assert bot.waiters == {}
+
+		with pytest.raises(asyncio.TimeoutError):
+			await bot.wait_for("on_reaction", timeout=0.01)
+		assert bot.waiters == {}
+
+	with patch.dict(Events.__EVENTS_LIST__, events):
+		asyncio.run(wait())
+
+def test_event_stream():
+	bot = Bot("token")
+
+	async def read():
+		stream = bot.stream(types=["MESSAGE_CREATE"], maxsize=2)
+		for i in range(3):
+			bot.dispatch({"op": 0, "t": "MESSAGE_CREATE", "s": i, "d": {}})
+		bot.dispatch({"op": 0, "t": "TYPING_START", "s": 3, "d": {}})
+		assert stream.dropped == 1
+
+		received = []
+		async def consume():
+			async for event in stream:
+				received.append(event["s"])
+		task = asyncio.ensure_future(consume())
+		await asyncio.sleep(0)
+		bot.dispatch({"op": 0, "t": "MESSAGE_CREATE", "s": 4, "d": {}})
+		await asyncio.sleep(0)
+		stream.close()
+		await task
+		assert received == [1, 2, 4]
+		assert bot.streams == set()
+
+	asyncio.run(read())
+
+def test_event_forwarder(tmp_path):
+	bot = Bot("token")
+
+	async def forward():
+		queue = QueueSink()
+		forwarder = bot.forward([queue, FileSink(tmp_path / "events.jsonl")], batch_size=2, batch_time=0.01)
+		forwarder.start()
+		for i in range(3):
+			bot.dispatch({"op": 0, "t": "MESSAGE_CREATE", "s": i, "d": {"content": "hello"}})
+		bot.dispatch({"op": 0, "t": "TYPING_START", "s": 3, "d": {}})
+		first = await queue.queue.get()
+		second = await queue.queue.get()
+		assert [len(first), len(second)] == [2, 1]
+		assert json.loads(first[0]) == {"op": 0, "t": "MESSAGE_CREATE", "s": 0, "d": {"content": "hello"}}
+		forwarder.stop()
+		await forwarder.task
+		assert forwarder.sent == 3
+
+		broken = Mock(write=AsyncMock(side_effect=OSError("closed")), close=AsyncMock())
+		forwarder = bot.forward([QueueSink(), broken], batch_size=10, batch_time=0.01, maxsize=2)
+		for i in range(3):
+			bot.dispatch({"op": 0, "t": "MESSAGE_CREATE", "s": i, "d": {}})
+		with patch("traceback.print_exception"):
+			forwarder.start()
+			forwarder.stop()
+			await forwarder.task
+		assert (forwarder.sent, forwarder.failed, forwarder.dropped) == (0, 2, 1)
+
+	asyncio.run(forward())
+	assert [json.loads(line)["s"] for line in open(tmp_path / "events.jsonl")] == [0, 1, 2]
+
+def test_voice_play():
+	def page(table, body):
+		return b"OggS" + bytes(22) + bytes([len(table)]) + bytes(table) + body
+
+	async def play():
+		reader = asyncio.StreamReader()
+		# a packet of 300 bytes continued on the next page, then a packet of 3 bytes
+		reader.feed_data(page([8], b"OpusHead") + page([255], b"a" * 255) + page([45, 3], b"a" * 45 + b"bcd"))
+		reader.feed_eof()
+		frames = [packet async for packet in OggReader(reader)]
+		assert frames == [b"OpusHead", b"a" * 300, b"bcd"]
+
+		client = Voice_Client("1", "2")
+		client.ssrc = 5
+		client.stream = AudioStream(5)
+		client.stream.sequence = 65535
+		packets = []
+		# the packets are views of the buffer of the stream, copied as the socket does
+		client.transport = Mock(sendto=lambda packet: packets.append(bytes(packet)))
+		client.gateway = Mock(send=AsyncMock())
+		client.ready.set()
+
+		async def source():
+			for frame in frames[1:]:
+				yield frame
+		start = time.monotonic()
+		await client.play(source())
+		assert time.monotonic() - start >= 0.13
+		assert len(packets) == 7
+		assert packets[0][:4] == b"\x80\x78\xff\xff" and packets[0][12:] == b"a" * 300
+		assert packets[1][2:8] == b"\x00\x00\x00\x00\x03\xc0"
+		assert packets[1][8:12] == b"\x00\x00\x00\x05"
+		assert client.gateway.send.call_args.args[0]["d"]["speaking"] == 0
+
+	asyncio.run(play())
+
+def test_rtp_header():
+	stream = AudioStream(7)
+	stream.sequence = 65535
+	stream.timestamp = 2**32 - 960
+	assert bytes(stream.encode_packet(b"abc")) == b"\x80\x78\xff\xff\xff\xff\xfc\x40\x00\x00\x00\x07abc"
+	assert (stream.sequence, stream.timestamp) == (0, 0)
+	assert bytes(stream.encode_packet(b"d" * 5000))[:4] == b"\x80\x78\x00\x00"
+	assert len(stream.encode_packet(b"e")) == 13
+
+def test_voice_manager():
+	bot = Bot("token")
+	bot.user = Mock(id="1")
+	payloads = asyncio.Queue()
+
+	class FakeGateway:
+		def __init__(self, url, token, presence=None):
+			self.send = AsyncMock()
+
+		async def connect(self, shards):
+			while True:
+				yield await payloads.get()
+
+	def event(name, data):
+		payloads.put_nowait({"op": 0, "t": name, "s": 1, "d": data})
+
+	async def connect():
+		with patch("piscord.Voice.Voice_Client") as client, patch("piscord.Piscord.Gateway", FakeGateway):
+			client.return_value.run = AsyncMock()
+			main = asyncio.ensure_future(bot._Bot__main("wss://gateway"))
+			await asyncio.sleep(0)
+			task = asyncio.ensure_future(bot.voice_manager.connect("10", "20"))
+			await asyncio.sleep(0)
+			assert bot.gateway.send.call_args.args[0] == {"op": 4, "d": {"guild_id": "10", "channel_id": "20", "self_mute": False, "self_deaf": False}}
+
+			event("VOICE_STATE_UPDATE", {"guild_id": "10", "user_id": "2", "channel_id": "20", "session_id": "other"})
+			event("VOICE_STATE_UPDATE", {"guild_id": "10", "user_id": "1", "channel_id": "20", "session_id": "session"})
+			await asyncio.sleep(0.01)
+			assert not client.called
+			event("VOICE_SERVER_UPDATE", {"guild_id": "10", "token": "token", "endpoint": "voice.discord.gg:443"})
+			await asyncio.sleep(0.01)
+			voice = bot.voices["10"]
+			assert client.return_value.endpoint == "voice.discord.gg"
+			assert client.return_value.session_id == "session"
+			voice.ready.set()
+			assert await task is voice
+
+			event("VOICE_STATE_UPDATE", {"guild_id": "10", "user_id": "1", "channel_id": None, "session_id": "session"})
+			await asyncio.sleep(0.01)
+			assert bot.voices == {}
+			assert client.return_value.stop.called
+			main.cancel()
+
+	asyncio.run(connect())
+
+def test_audio_sources():
+	numpy = pytest.importorskip("numpy")
+
+	async def mix():
+		quiet = PCMSource(numpy.full(FRAME_SAMPLES * 2 * 3, 1000, "<i2").tobytes())
+		loud = GeneratorSource(numpy.full(FRAME_SAMPLES * 2, 30000, "<i2") for i in range(2))
+		mixer = Mixer()
+		mixer.add(quiet, volume=0.5)
+		mixer.add(loud)
+		frames = [numpy.frombuffer(frame, "<i2") async for frame in mixer]
+		assert len(frames) == 3 and all(len(frame) == FRAME_SAMPLES * 2 for frame in frames)
+		assert (frames[0] == 30500).all() and (frames[2] == 500).all()
+
+		mixer = Mixer(gain=2.0)
+		mixer.add(GeneratorSource(iter([numpy.full(FRAME_SAMPLES * 2, 20000, "<i2")])))
+		assert (numpy.frombuffer(await mixer.read(), "<i2") == 32767).all()
+
+		volume = VolumeSource(PCMSource(numpy.full(100, -1000, "<i2").tobytes()), 0.1)
+		frame = numpy.frombuffer(await volume.read(), "<i2")
+		assert len(frame) == FRAME_SAMPLES * 2 and frame[0] == -100 and frame[-1] == 0
+		assert await volume.read() == b""
+
+		# the last frame of a generator is shorter : completed with silence
+		mixer = Mixer()
+		mixer.add(GeneratorSource(iter([numpy.full(100, 1000, "<i2").tobytes()])))
+		frame = numpy.frombuffer(await mixer.read(), "<i2")
+		assert len(frame) == FRAME_SAMPLES * 2 and frame[99] == 1000 and frame[100] == 0
+		mixer.add(GeneratorSource(iter([bytes(FRAME_SIZE + 2)])))
+		with pytest.raises(ValueError):
+			await mixer.read()
+
+	asyncio.run(mix())
+	with pytest.raises(TypeError):
+		AudioSource()
+
+def test_voice_receive():
+	buffer = JitterBuffer(delay=2)
+	buffer.push(65535, b"a")
+	assert buffer.pop() == [b"a"]
+	buffer.push(1, b"c")
+	buffer.push(0, b"b")
+	assert buffer.pop() == [b"b", b"c"]
+	buffer.push(3, b"e")
+	buffer.push(4, b"f")
+	assert buffer.pop() == []
+	buffer.push(5, b"g")
+	assert buffer.pop() == [None, b"e", b"f", b"g"]
+	buffer.push(2, b"d")
+	assert buffer.pop() == []
+
+	async def receive():
+		client = Voice_Client("1", "2")
+		client.stream = AudioStream(5)
+		client.ssrc_users[9] = "3"
+		with patch("piscord.Voice.Decoder") as decoder:
+			decoder.return_value.decode = lambda frame: b"pcm " + frame
+			receiver = VoiceReceiver(client.receivers)
+			client.receivers.add(receiver)
+			sender = AudioStream(9)
+			client.receive_packet(bytes(sender.encode_packet(b"hello")))
+			client.receive_packet(b"\x80\xc8" + bytes(20))
+			receiver.close()
+			assert [frame async for frame in receiver] == [("3", b"pcm hello")]
+
+	asyncio.run(receive())
+
+def test_voice_gateway():
+	received = []
+
+	async def server(websocket, *args):
+		await websocket.send(json.dumps({"op": 8, "d": {"heartbeat_interval": 20}}))
+		payload = json.loads(await websocket.recv())
+		received.append(payload["op"])
+		if payload["op"] == 0:
+			# the voice server crashed : the session is resumed
+			await websocket.close(4015)
+			return
+		await websocket.send(json.dumps({"op": 9, "d": None}))
+		heartbeat = json.loads(await websocket.recv())
+		await websocket.send(json.dumps({"op": 6, "d": heartbeat["d"]}))
+		await websocket.wait_closed()
+
+	async def connect():
+		async with websockets.serve(server, "127.0.0.1", 0) as listening:
+			port = listening.sockets[0].getsockname()[1]
+			gateway = VoiceGateway(f"ws://127.0.0.1:{port}", "1", "2", "session", "token")
+			async for data in gateway.connect():
+				if data["op"] == 6:
+					break
+			assert received == [0, 7]
+			assert gateway.close_code == 4015
+			assert gateway.nonce is None and 0 <= gateway.latency < 1
+			gateway.stop()
+			await gateway._stop()
+
+	asyncio.run(connect())
+
+def test_voice_client_failure(capsys):
+	async def connect(self):
+		# the voice server closes the connection with 4004 (invalid token)
+		raise TokenError()
+		yield
+
+	async def run():
+		ready = asyncio.Event()
+		ready.set()
+		client = Voice_Client("1", "2", ready)
+		with patch.object(VoiceGateway, "connect", connect):
+			await client.run()
+		assert client.running is False and not ready.is_set()
+		assert isinstance(client.error, TokenError)
+
+	asyncio.run(run())
+	assert "TokenError" in capsys.readouterr().err
+
+def test_webhook_client():
+	requests = []
+
+	async def execute(request):
+		requests.append((request.match_info["id"], request.query.get("wait"), await request.json()))
+		if len(requests) == 1:
+			return web.json_response({"retry_after": 0.01}, status=429, headers={"Retry-After": "0.01"})
+		if request.query.get("wait"):
+			return web.json_response({"id": "99"}, headers={"X-RateLimit-Limit": "5", "X-RateLimit-Remaining": "4", "X-RateLimit-Reset-After": "1"})
+		return web.Response(status=204)
+
+	async def send():
+		async with api_server(("POST", "/webhooks/{id}/{token}", execute)) as url, WebhookClient() as client:
+			client.api_url = url
+			webhook = client.webhook("https://discord.com/api/webhooks/12/token")
+			assert await webhook.send("hello", wait=True) == {"id": "99"}
+			assert await webhook.send_embeds([{"title": str(i)} for i in range(23)]) == [None] * 3
+			# 2000 characters by embed : 3 embeds by message at most
+			long_embeds = [Embed({"description": "a" * 1500, "fields": [{"name": "b" * 250, "value": "c" * 250}]}) for i in range(4)]
+			assert await webhook.send_embeds(long_embeds + [{"description": "d" * 10}]) == [None] * 2
+
+	asyncio.run(send())
+	assert requests[0] == requests[1] == ("12", "true", {"content": "hello"})
+	assert [len(request[2]["embeds"]) for request in requests[2:]] == [10, 10, 3, 3, 2]
+
+def test_files(tmp_path):
+	import io
+	path = tmp_path / "image.png"
+	path.write_bytes(b"png")
+	opened = File(str(path)).payload()
+	assert File(str(path)).filename == "image.png" and opened.read() == b"png"
+	opened.close()
+
+	data = memoryview(b"data")
+	assert File(data).payload() is data and File.convert([b"data", "a.txt"]).filename == "a.txt"
+
+	fp = io.BytesIO(b"skip content")
+	fp.seek(5)
+	file = File(fp, "c.txt")
+	assert file.payload().read() == b"content"
+	assert file.payload().read() == b"content"
+
+	async def chunks():
+		yield b"chunk"
+
+	iterator = File(chunks(), "d.txt")
+	iterator.payload()
+	with pytest.raises(FileError):
+		iterator.payload()
+	with pytest.raises(TypeError):
+		File(42)
+
+	uploads = []
+
+	async def upload(request):
+		form = await request.post()
+		uploads.append({name: field.file.read() for name, field in form.items() if name != "payload_json"})
+		if len(uploads) == 1:
+			return web.json_response({"retry_after": 0.01}, status=429, headers={"Retry-After": "0.01"})
+		return web.json_response({"id": str(len(uploads))})
+
+	async def send():
+		bot = Bot("token")
+		async with api_server(("POST", "/channels/1/messages", upload)) as url:
+			bot.api_url = url
+			with patch.object(Bot, "api_call", bot_api_call):
+				# the file object is read again after the 429
+				assert await bot.api_async("/channels/1/messages", "POST", files=[file]) == {"id": "2"}
+				with pytest.raises(FileNotFoundError):
+					await bot.api_async("/channels/1/messages", "POST", files=[str(tmp_path / "missing")])
+				# the bucket is released after the error : the next request is sent
+				assert await asyncio.wait_for(bot.api_async("/channels/1/messages", "POST", files=[b"ok"]), 5) == {"id": "3"}
+				uploads.clear()
+				with pytest.raises(FileError):
+					await bot.api_async("/channels/1/messages", "POST", files=[File(chunks(), "e.txt")])
+
+	asyncio.run(send())
+	assert uploads == [{"file 0": b"chunk"}]
+
+def test_embed_builder():
+	embed = Embed().set_title("News", "https://example.com").set_color(255).add("Version", "1.5", inline=True)
+	json = embed.to_json()
+	assert json == {"title": "News", "url": "https://example.com", "color": 255, "fields": [{"name": "Version", "value": "1.5", "inline": True}]}
+	assert embed.to_json() is json
+
+	embed.set_footer("footer")
+	assert embed.to_json()["footer"] == {"text": "footer"}
+	embed.fields[0].value = "1.6"
+	assert embed.to_json()["fields"][0]["value"] == "1.6"
+	embed.fields.append(Embed({"fields": [{"name": "a", "value": "b"}]}).fields[0])
+	assert len(embed.to_json()["fields"]) == 2
+	embed.fields[0] = Embed({"fields": [{"name": "c", "value": "d"}]}).fields[0]
+	assert embed.to_json()["fields"][0] == {"name": "c", "value": "d"}
+	embed.fields[0].value = "e"
+	assert embed.to_json()["fields"][0]["value"] == "e"
+	embed.fields.pop()
+	embed.fields.append(Embed({"fields": [{"name": "f", "value": "g"}]}).fields[0])
+	assert embed.to_json()["fields"][1]["name"] == "f"
+
+	with pytest.raises(EmbedError):
+		embed.set_title("a" * 257)
+	for i in range(23):
+		embed.add(str(i), "value")
+	with pytest.raises(EmbedError):
+		embed.add("26", "value")
+	embed.clear_fields().set_description("a" * 2048)
+	for i in range(4):
+		embed.add("field", "a" * 1000)
+	with pytest.raises(EmbedError):
+		embed.to_json()
+
+def test_broadcast():
+	bodies = []
+	calls = {}
+
+	async def create_message(request):
+		channel_id = request.match_info["id"]
+		calls[channel_id] = calls.get(channel_id, 0) + 1
+		assert request.headers["Authorization"] == "Bot token" and request.headers["Content-Type"] == "application/json"
+		bodies.append(await request.read())
+		if channel_id == "2" and calls[channel_id] < 3:
+			return web.Response(status=502)
+		if channel_id == "3":
+			return web.json_response({"message": "Missing Permissions", "code": 50013}, status=403)
+		return web.json_response({"id": "m" + channel_id, "channel_id": channel_id})
+
+	bot = Bot("token")
+	embed = Embed().set_title("News")
+
+	async def send():
+		async with api_server(("POST", "/channels/{id}/messages", create_message)) as url:
+			bot.api_url = url
+			with patch.object(Bot, "api_call", bot_api_call):
+				first = await bot.broadcast_async(["1", "2", "3", "4", "1"], "hello", embed)
+				second = await bot.broadcast_async(["2"], "hello", embed, retry_policy=RetryPolicy(backoff=0.01, methods=("POST",)))
+				return first, second
+
+	result, retried = asyncio.run(send())
+	# the server error is not retried by default : the message may have been created
+	assert set(result.sent) == {"1", "4"} and set(result.failed) == {"2", "3"}
+	assert isinstance(result.failed["2"], ServerError) and result.failed["3"].code == 50013
+	assert retried.success and calls == {"1": 1, "2": 3, "3": 1, "4": 1}
+	assert set(bodies) == {json.dumps({"content": "hello", "embed": embed.to_json()}).encode()}
+	assert RetryPolicy().should_retry("POST", 0, sent=False) and not RetryPolicy().should_retry("POST", 0)
+
+	limiter = bot.ratelimiter.__class__(global_limit=2)
+	delays = [limiter._reserve(limiter.get_bucket("GET", f"/channels/{i}")) for i in range(3)]
+	assert delays[:2] == [None, None] and 0 < delays[2] <= 1
+
+def test_http_errors():
+	tries = []
+
+	async def message(request):
+		tries.append(request.method)
+		assert request.headers["Authorization"] == "Bot token"
+		if request.match_info["id"] == "404":
+			return web.json_response({"message": "Unknown Message", "code": 10008}, status=404)
+		if request.match_info["id"] == "429":
+			return web.json_response({"retry_after": 120}, status=429, headers={"Retry-After": "120"})
+		if len(tries) < 3:
+			return web.Response(status=503, text="upstream error")
+		return web.json_response({"id": "1"})
+
+	async def send():
+		bot = Bot("token")
+		bot.retry_policy = RetryPolicy(backoff=0.01)
+		async with api_server(("*", "/channels/1/messages/{id}", message)) as url:
+			bot.api_url = url
+			with patch.object(Bot, "api_call", bot_api_call):
+				assert await bot.api_async("/channels/1/messages/1") == {"id": "1"}
+				assert tries == ["GET"] * 3
+				with pytest.raises(NotFound) as error:
+					await bot.api_async("/channels/1/messages/404")
+				assert (error.value.status, error.value.code, error.value.route) == (404, 10008, "GET /channels/1/messages/404")
+				with pytest.raises(RateLimited) as error:
+					await bot.api_async("/channels/1/messages/429", "DELETE")
+				assert error.value.retry_after == 120
+				tries.clear()
+				with pytest.raises(ServerError):
+					await bot.api_async("/channels/1/messages/1", "POST", json={})
+				assert tries == ["POST"]
+
+	asyncio.run(send())
+	assert isinstance(NotFound(), HTTPException) and str(NotFound(404, 10008, "GET /", "Unknown")) == "The resource was not found : Unknown (code 10008) - 404 GET /"